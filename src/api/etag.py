@@ -0,0 +1,15 @@
+from fastapi import Request, Response, status
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header lists this ETag (or *)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response; the client re-uses its cached body."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
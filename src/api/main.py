@@ -1,22 +1,49 @@
+import os
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from src.db.session import Base, engine
+from fastapi.middleware.gzip import GZipMiddleware
+from src.db.upgrades import migrate
 from src.api.routes.subscriptions import router as subs_router
 from src.api.routes.ingest import router as ingest_router
 from src.api.routes.status import router as status_router
+from src.queue.batcher import start_batcher, stop_batcher
+from src.cache.subscription_cache import start_invalidation_listener
 from src.models.subscription import Subscription
 from src.models.delivery_log import DeliveryLog
 
-# Auto-create all tables
-Base.metadata.create_all(bind=engine)
+# Interactive docs and the OpenAPI schema are only served in development
+DOCS_ENABLED = os.getenv("ENV") == "dev"
 
 app = FastAPI(
     title="Webhook Delivery Service",
     version="0.1.0",
-    openapi_url="/openapi.json",
-    docs_url="/docs",
+    openapi_url="/openapi.json" if DOCS_ENABLED else None,
+    docs_url="/docs" if DOCS_ENABLED else None,
+    redoc_url="/redoc" if DOCS_ENABLED else None,
+    default_response_class=ORJSONResponse,
 )
 
+@app.on_event("startup")
+def _init_db():
+    # Opt-in schema setup. Every uvicorn worker runs this; migrate() holds
+    # an advisory lock so they take turns instead of racing on DDL.
+    if os.getenv("AUTO_MIGRATE") == "1":
+        migrate()
+
+@app.on_event("startup")
+async def _start_ingest_batcher():
+    start_batcher()
+
+@app.on_event("startup")
+def _start_cache_invalidation():
+    start_invalidation_listener()
+
+@app.on_event("shutdown")
+async def _stop_ingest_batcher():
+    # Flush anything still buffered before the process exits
+    await stop_batcher()
+
 origins = [
     "http://localhost:5173", # Vite default dev server
     "http://localhost:3000", # Create React App default
@@ -31,6 +58,13 @@ app.add_middleware(
     allow_headers=["*"], # Allow all headers
 )
 
+# Status and list responses compress well; tiny bodies aren't worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+@app.get("/health", include_in_schema=False)
+def health():
+    return {"status": "ok"}
+
 # Subscription CRUD
 app.include_router(
     subs_router,
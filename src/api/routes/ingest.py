@@ -1,15 +1,51 @@
+import hashlib
+import hmac
 import uuid
+from functools import lru_cache
 from uuid import UUID
-# Import Request and json module
 from fastapi import APIRouter, Header, HTTPException, status, Request
-from starlette.responses import JSONResponse
-import json # Needed for JSONDecodeError
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from rq import Queue
+import orjson
 
 from src.cache.subscription_cache import get_subscription
-from src.queue.redis_conn import delivery_queue
+from src.queue.batcher import submit
+from src.queue.rate_limit import consume, DEFAULT_BURST, DEFAULT_RATE_PER_SEC
 
 router = APIRouter()
 
+SIGNATURE_PREFIX = "sha256="
+
+@lru_cache(maxsize=4096)
+def _keyed_hmac(secret: str) -> hmac.HMAC:
+    # Key each subscription's HMAC once; requests sign with a copy, which
+    # starts from the keyed inner/outer state instead of re-deriving it.
+    # Never update the cached object itself.
+    return hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+def _sign(secret: str, body: bytes) -> str:
+    """
+    Canonical X-Signature for a body: "sha256=" + hex HMAC-SHA256. hashlib
+    is backed by OpenSSL, which uses the CPU's SHA extensions where available.
+    """
+    mac = _keyed_hmac(secret).copy()
+    mac.update(body)
+    return SIGNATURE_PREFIX + mac.hexdigest()
+
+def _signature_valid(expected: str, signature: str | None) -> bool:
+    """
+    Check an X-Signature header against the canonical signature in constant
+    time. The sender may omit the "sha256=" prefix.
+    """
+    if not signature:
+        return False
+    if not signature.startswith(SIGNATURE_PREFIX):
+        signature = SIGNATURE_PREFIX + signature
+    # compare_digest rejects non-ASCII str; compare the header's raw bytes
+    # (Starlette decodes headers as latin-1) so junk gets a 401, not a 500
+    return hmac.compare_digest(expected.encode(), signature.encode("latin-1", "replace"))
+
 @router.post(
     "/ingest/{subscription_id}",
     status_code=status.HTTP_202_ACCEPTED,
@@ -21,38 +57,78 @@ async def ingest_webhook(
     x_event_type: str | None = Header(None),
     x_signature: str | None = Header(None),
 ):
-    # 1) Cache-first lookup (falls back to DB if needed)
-    sub_data = get_subscription(subscription_id)
+    # 1) Cache-first lookup (falls back to DB if needed).
+    # get_subscription does blocking Redis/DB I/O, so keep it off the event loop.
+    sub_data = await run_in_threadpool(get_subscription, subscription_id)
     if not sub_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Subscription not found",
         )
 
-    # 2) Read payload
+    # 2) Read payload. If the subscription has a secret, the sender must
+    # sign the raw bytes; check that before charging the rate limit (so
+    # forged requests can't drain the real sender's bucket) and before
+    # doing any parsing.
+    # The signature is computed once here and travels with the job, so
+    # neither the worker nor its retries ever re-hash the body.
+    body = await request.body()
+    signature = x_signature
+    if sub_data.get("secret"):
+        signature = _sign(sub_data["secret"], body)
+        if not _signature_valid(signature, x_signature):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or missing X-Signature",
+            )
+
+    # 3) Admission control: per-subscription token bucket
+    capacity = sub_data.get("rate_limit_burst") or DEFAULT_BURST
+    rate = sub_data.get("rate_limit_per_sec") or DEFAULT_RATE_PER_SEC
+    allowed, retry_after = await run_in_threadpool(
+        consume, subscription_id, capacity, rate
+    )
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded for subscription",
+            headers={
+                "Retry-After": str(retry_after),
+                "RateLimit-Limit": str(capacity),
+            },
+        )
+
+    # Parse the raw bytes with orjson (C) rather than request.json(), which
+    # uses the stdlib json module on the event loop. The payload is only
+    # validated here; the worker re-POSTs the raw bytes.
     try:
-        payload = await request.json()
-    except json.JSONDecodeError:
-        # If request.json() fails, raise a 400 Bad Request
+        orjson.loads(body)
+    except orjson.JSONDecodeError:
+        # If the body isn't valid JSON, raise a 400 Bad Request
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid JSON body received.",
         )
 
-    # 3) Generate a webhook_id & enqueue first attempt
+    # 4) Generate a webhook_id & hand the first attempt to the batcher,
+    # which enqueues buffered jobs together in one pipeline.
     webhook_id = uuid.uuid4()
-    delivery_queue.enqueue(
+    job_data = Queue.prepare_data(
         "src.workers.delivery_worker.process_delivery",
-        subscription_id,
-        payload,
-        x_event_type,
-        x_signature,
-        webhook_id,
-        1,  # attempt number
+        args=(
+            subscription_id,
+            body,
+            request.headers.get("content-type", "application/json"),
+            x_event_type,
+            signature,
+            webhook_id,
+            1,  # attempt number
+        ),
     )
+    await submit(job_data)
 
-    # 4) Return 202 + webhook_id for status checks
-    return JSONResponse(
+    # 5) Return 202 + webhook_id for status checks
+    return ORJSONResponse(
         status_code=status.HTTP_202_ACCEPTED,
         content={"webhook_id": str(webhook_id)},
     )
@@ -1,22 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from uuid import UUID
 from typing import List
+from datetime import datetime
 
-from src.db.session import SessionLocal
+from src.db.session import get_db
 from src.models.delivery_log import DeliveryLog
 from src.api.schemas import DeliveryAttempt, StatusResponse
+from src.api.etag import etag_matches, not_modified
+from src.cache.webhook_status import get_webhook_summary
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get(
     "/status/{webhook_id}",
     response_model=StatusResponse,
@@ -24,28 +20,49 @@ def get_db():
 )
 def get_webhook_status(
     webhook_id: UUID,
+    request: Request,
+    response: Response,
+    include: str | None = None,
     db: Session = Depends(get_db),
 ):
-    # 1) total count
-    total = db.query(func.count(DeliveryLog.id)) \
-              .filter(DeliveryLog.webhook_id == webhook_id) \
-              .scalar()
-    if total == 0:
+    # Without ?include=attempts, answer from the status summary the worker
+    # maintains in Redis and skip Postgres entirely.
+    if include != "attempts":
+        summary = get_webhook_summary(webhook_id)
+        if summary is not None:
+            etag = (
+                f'W/"{webhook_id}-{summary["total_attempts"]}-'
+                f'{int(summary["last_attempt_at"].timestamp() * 1_000_000)}"'
+            )
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            response.headers["ETag"] = etag
+            return {"webhook_id": webhook_id, **summary, "recent_attempts": []}
+
+    # Recent attempts (most recent first, up to 20) plus the total count
+    # in one round-trip: COUNT(*) OVER () is evaluated before the LIMIT.
+    rows = db.execute(
+        select(DeliveryLog, func.count().over().label("total"))
+          .where(DeliveryLog.webhook_id == webhook_id)
+          .order_by(DeliveryLog.timestamp.desc())
+          .limit(20)
+    ).all()
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No delivery logs for given webhook_id",
         )
 
-    # 2) recent attempts (most recent first, up to 20)
-    logs = (
-        db.query(DeliveryLog)
-          .filter(DeliveryLog.webhook_id == webhook_id)
-          .order_by(DeliveryLog.timestamp.desc())
-          .limit(20)
-          .all()
-    )
-
+    total = rows[0].total
+    logs = [row.DeliveryLog for row in rows]
     last = logs[0]
+
+    # A new attempt changes the count and the latest timestamp
+    etag = f'W/"{webhook_id}-{total}-{int(last.timestamp.timestamp() * 1_000_000)}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
     return {
         "webhook_id": webhook_id,
         "subscription_id": last.subscription_id,
@@ -65,13 +82,16 @@ def get_webhook_status(
 def list_subscription_attempts(
     subscription_id: UUID,
     limit: int = 20,
+    before: datetime | None = None,
     db: Session = Depends(get_db),
 ):
-    logs = (
-        db.query(DeliveryLog)
-          .filter(DeliveryLog.subscription_id == subscription_id)
-          .order_by(DeliveryLog.timestamp.desc())
-          .limit(limit)
-          .all()
-    )
+    stmt = select(DeliveryLog).where(DeliveryLog.subscription_id == subscription_id)
+    # Keyset pagination: pass the last item's timestamp as `before` to get
+    # the next page, instead of an OFFSET that scans skipped rows.
+    if before is not None:
+        stmt = stmt.where(DeliveryLog.timestamp < before)
+    logs = db.scalars(
+        stmt.order_by(DeliveryLog.timestamp.desc())
+            .limit(limit)
+    ).all()
     return logs
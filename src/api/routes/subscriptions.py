@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 
-from src.db.session import SessionLocal
+from src.db.session import get_db
 from src.models.subscription import Subscription
 from src.api.schemas import (
     SubscriptionCreate,
@@ -11,16 +13,10 @@ from src.api.schemas import (
     SubscriptionUpdate,
 )
 from src.cache.subscription_cache import cache_subscription, invalidate_subscription
+from src.api.etag import etag_matches, not_modified
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post(
     "/",
     response_model=SubscriptionOut,
@@ -31,7 +27,7 @@ def create_subscription(
     db: Session = Depends(get_db),
 ):
     # Convert Pydantic model to dict
-    sub_data = subscription_in.dict()
+    sub_data = subscription_in.model_dump()
 
     # Convert AnyHttpUrl to string before creating SQLAlchemy model 
     if sub_data.get("target_url"):
@@ -52,23 +48,46 @@ def create_subscription(
 @router.get("/{subscription_id}", response_model=SubscriptionOut)
 def read_subscription(
     subscription_id: UUID,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
 ):
-    sub = db.query(Subscription).get(subscription_id)
+    sub = db.get(Subscription, subscription_id)
     if not sub:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Subscription not found",
         )
+
+    # Weak ETag from id + last change; pollers get a cheap 304
+    etag = f'W/"{sub.id}-{int(sub.updated_at.timestamp() * 1_000_000)}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return sub
 
+def _subscription_row(sub: Subscription) -> dict:
+    # Same shape as SubscriptionOut; stored values were validated on write
+    return {
+        "id": str(sub.id),
+        "target_url": sub.target_url,
+        "secret": sub.secret,
+        "events": sub.events,
+        "rate_limit_per_sec": sub.rate_limit_per_sec,
+        "rate_limit_burst": sub.rate_limit_burst,
+    }
+
 @router.get("/", response_model=List[SubscriptionOut])
 def list_subscriptions(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
 ):
-    return db.query(Subscription).offset(skip).limit(limit).all()
+    # Returning a Response skips response_model validation, which would
+    # re-run AnyHttpUrl parsing on every row; the model still documents
+    # the shape in OpenAPI.
+    subs = db.scalars(select(Subscription).offset(skip).limit(limit)).all()
+    return ORJSONResponse(content=[_subscription_row(sub) for sub in subs])
 
 @router.patch("/{subscription_id}", response_model=SubscriptionOut)
 def update_subscription(
@@ -76,7 +95,7 @@ def update_subscription(
     subscription_in: SubscriptionUpdate,
     db: Session = Depends(get_db),
 ):
-    sub = db.query(Subscription).get(subscription_id)
+    sub = db.get(Subscription, subscription_id)
     if not sub:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -84,7 +103,7 @@ def update_subscription(
         )
 
     # Get update data, excluding unset fields
-    update_data = subscription_in.dict(exclude_unset=True)
+    update_data = subscription_in.model_dump(exclude_unset=True)
 
     for field, value in update_data.items():
         # Convert AnyHttpUrl to string if target_url is being updated
@@ -109,7 +128,7 @@ def delete_subscription(
     subscription_id: UUID,
     db: Session = Depends(get_db),
 ):
-    sub = db.query(Subscription).get(subscription_id)
+    sub = db.get(Subscription, subscription_id)
     if not sub:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,13 +1,15 @@
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
-from pydantic import BaseModel, AnyHttpUrl
+from pydantic import BaseModel, AnyHttpUrl, ConfigDict, Field
 
 
 class SubscriptionBase(BaseModel):
     target_url: AnyHttpUrl
     secret: Optional[str] = None
     events: Optional[List[str]] = None
+    rate_limit_per_sec: Optional[float] = Field(None, gt=0)
+    rate_limit_burst: Optional[int] = Field(None, gt=0)
 
 class SubscriptionCreate(SubscriptionBase):
     pass
@@ -16,12 +18,13 @@ class SubscriptionUpdate(BaseModel):
     target_url: Optional[AnyHttpUrl] = None
     secret: Optional[str] = None
     events: Optional[List[str]] = None
+    rate_limit_per_sec: Optional[float] = Field(None, gt=0)
+    rate_limit_burst: Optional[int] = Field(None, gt=0)
 
 class SubscriptionOut(SubscriptionBase):
     id: UUID
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DeliveryAttempt(BaseModel):
     id: UUID
@@ -34,8 +37,7 @@ class DeliveryAttempt(BaseModel):
     status_code: Optional[int] = None
     error: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class StatusResponse(BaseModel):
     webhook_id: UUID
@@ -47,5 +49,4 @@ class StatusResponse(BaseModel):
     error: Optional[str] = None
     recent_attempts: List[DeliveryAttempt]
 
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,37 +1,130 @@
-import json
+import logging
+import os
+import threading
+import time
 from uuid import UUID
+import orjson
+from cachetools import TTLCache
 from src.queue.redis_conn import redis_conn
 from src.db.session import SessionLocal
 from src.models.subscription import Subscription
 from sqlalchemy.orm import Session
 
+logger = logging.getLogger(__name__)
+
 CACHE_PREFIX = "subscription:"
+INVALIDATION_CHANNEL = "subscription:invalidate"
+# Redis entries slide: every hit pushes the expiry out again, so only
+# subscriptions that stop receiving traffic age out.
+REDIS_TTL = int(os.getenv("SUBSCRIPTION_CACHE_TTL", "3600"))  # in seconds
+
+# Process-local (L1) cache in front of Redis. Each process has its own copy,
+# so the TTL bounds staleness if an invalidation message is missed.
+L1_MAXSIZE = int(os.getenv("SUBSCRIPTION_L1_MAXSIZE", "10000"))
+L1_TTL = int(os.getenv("SUBSCRIPTION_L1_TTL", "60"))  # in seconds
+
+# TTLCache is not thread-safe; the API calls get_subscription from its
+# threadpool and the invalidation listener runs in its own thread.
+_l1 = TTLCache(maxsize=L1_MAXSIZE, ttl=L1_TTL)
+_l1_lock = threading.Lock()
+_listener: threading.Thread | None = None
 
 def _make_key(subscription_id: str) -> str:
     return f"{CACHE_PREFIX}{subscription_id}"
 
-def cache_subscription(sub: Subscription) -> None:
-    """
-    Store the subscription’s core fields in Redis under a JSON string.
-    """
-    key = _make_key(str(sub.id))
-    data = {
+def _l1_get(subscription_id: str) -> dict | None:
+    with _l1_lock:
+        return _l1.get(subscription_id)
+
+def _l1_set(subscription_id: str, data: dict) -> None:
+    with _l1_lock:
+        _l1[subscription_id] = data
+
+def _l1_evict(subscription_id: str) -> None:
+    with _l1_lock:
+        _l1.pop(subscription_id, None)
+
+def clear_local_cache() -> None:
+    """Drop every L1 entry in this process."""
+    with _l1_lock:
+        _l1.clear()
+
+def _to_cache_dict(sub: Subscription) -> dict:
+    return {
         "id": str(sub.id),
         "target_url": sub.target_url,
         "secret": sub.secret,
         "events": sub.events or [],
+        "rate_limit_per_sec": sub.rate_limit_per_sec,
+        "rate_limit_burst": sub.rate_limit_burst,
     }
+
+# Hash fields stored per subscription; None is stored as ""
+_HASH_FIELDS = ("target_url", "secret", "events", "rate_limit_per_sec", "rate_limit_burst")
+
+def _decode(value):
+    # The app connection decodes responses, raw connections return bytes
+    return value.decode() if isinstance(value, bytes) else value
+
+def _to_hash(data: dict) -> dict:
+    return {
+        "target_url": data["target_url"],
+        "secret": data["secret"] or "",
+        "events": orjson.dumps(data["events"]),
+        "rate_limit_per_sec": "" if data["rate_limit_per_sec"] is None else str(data["rate_limit_per_sec"]),
+        "rate_limit_burst": "" if data["rate_limit_burst"] is None else str(data["rate_limit_burst"]),
+    }
+
+def _from_hash(subscription_id: str, values: list) -> dict | None:
+    target_url, secret, events, rate, burst = (_decode(v) for v in values)
+    if not target_url:
+        return None
+    return {
+        "id": subscription_id,
+        "target_url": target_url,
+        "secret": secret or None,
+        "events": orjson.loads(events) if events else [],
+        "rate_limit_per_sec": float(rate) if rate else None,
+        "rate_limit_burst": int(burst) if burst else None,
+    }
+
+def _write_hash(pipe, key: str, data: dict) -> None:
+    # DEL + HSET inside the pipeline's MULTI/EXEC: replaces the whole record
+    # atomically, including entries left over in the old JSON-string format.
+    pipe.delete(key)
+    pipe.hset(key, mapping=_to_hash(data))
+    pipe.expire(key, REDIS_TTL)
+
+def cache_subscription(sub: Subscription, pipeline=None) -> None:
+    """
+    Store the subscription’s core fields in Redis as a hash and tell other
+    processes to evict their L1 copy, in a single round-trip.
+
+    Args:
+        sub: The subscription to cache
+        pipeline: Optional Redis pipeline to queue the commands on. The
+            caller is then responsible for executing it.
+    """
+    sid = str(sub.id)
+    key = _make_key(sid)
+    data = _to_cache_dict(sub)
+    _l1_evict(sid)
     try:
-        redis_conn.set(key, json.dumps(data))
+        pipe = pipeline if pipeline is not None else redis_conn.pipeline()
+        _write_hash(pipe, key, data)
+        pipe.publish(INVALIDATION_CHANNEL, sid)
+        if pipeline is None:
+            pipe.execute()
     except Exception:
         # Silently ignore caching failures
         pass
 
 def get_subscription(subscription_id: UUID | str, db: Session = None) -> dict | None:
     """
-    Return the subscription data dict from Redis if present; otherwise
-    load from Postgres, cache it, and return. Returns None if no such
-    subscription exists. Cache failures are silently ignored.
+    Return the subscription data dict from the process-local cache or
+    Redis if present; otherwise load from Postgres, cache it, and return.
+    Returns None if no such subscription exists. Cache failures are
+    silently ignored.
     
     Args:
         subscription_id: The UUID of the subscription to get
@@ -40,15 +133,26 @@ def get_subscription(subscription_id: UUID | str, db: Session = None) -> dict |
     sid = str(subscription_id)
     key = _make_key(sid)
 
-    # 1) Try cache
+    # 1) Try the in-process cache, then Redis
+    data = _l1_get(sid)
+    if data is not None:
+        return data
+
     try:
-        raw = redis_conn.get(key)
-        if raw:
-            try:
-                return json.loads(raw)
-            except json.JSONDecodeError:
-                # corrupted cache entry; fall back to DB
-                pass
+        # Lookup and TTL refresh in one round-trip. EXPIRE on a missing
+        # key is a no-op, so a miss needs no special casing here.
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.hmget(key, *_HASH_FIELDS)
+        pipe.expire(key, REDIS_TTL)
+        values, _ = pipe.execute()
+        try:
+            data = _from_hash(sid, values)
+        except (orjson.JSONDecodeError, ValueError):
+            # corrupted cache entry; fall back to DB
+            data = None
+        if data is not None:
+            _l1_set(sid, data)
+            return data
     except Exception:
         # Redis unavailable or error → cache miss
         pass
@@ -60,20 +164,18 @@ def get_subscription(subscription_id: UUID | str, db: Session = None) -> dict |
         session_created = True
     
     try:
-        sub = db.query(Subscription).get(sid)
+        sub = db.get(Subscription, sid)
         if not sub:
             return None
-        data = {
-            "id": str(sub.id),
-            "target_url": sub.target_url,
-            "secret": sub.secret,
-            "events": sub.events or [],
-        }
+        data = _to_cache_dict(sub)
         # Try to update cache (best‐effort)
         try:
-            redis_conn.set(key, json.dumps(data))
+            pipe = redis_conn.pipeline()
+            _write_hash(pipe, key, data)
+            pipe.execute()
         except Exception:
             pass
+        _l1_set(sid, data)
         return data
     finally:
         if session_created:
@@ -83,8 +185,44 @@ def invalidate_subscription(subscription_id: UUID | str) -> None:
     """
     Remove a subscription’s cache entry (e.g. on delete).
     """
-    key = _make_key(str(subscription_id))
+    sid = str(subscription_id)
+    key = _make_key(sid)
+    _l1_evict(sid)
     try:
-        redis_conn.delete(key)
+        pipe = redis_conn.pipeline()
+        pipe.delete(key)
+        pipe.publish(INVALIDATION_CHANNEL, sid)
+        pipe.execute()
     except Exception:
         pass
+
+def start_invalidation_listener() -> None:
+    """
+    Subscribe to invalidation messages in a background thread so this
+    process evicts its L1 entries when another process changes a
+    subscription. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    def _listen():
+        while True:
+            try:
+                pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    sid = message["data"]
+                    if isinstance(sid, bytes):
+                        sid = sid.decode()
+                    _l1_evict(sid)
+            except Exception:
+                # Messages may have been missed while disconnected
+                logger.warning("Subscription invalidation listener lost Redis; retrying")
+                clear_local_cache()
+                time.sleep(1)
+
+    _listener = threading.Thread(
+        target=_listen, name="subscription-invalidation", daemon=True
+    )
+    _listener.start()
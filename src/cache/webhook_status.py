@@ -0,0 +1,70 @@
+from datetime import datetime
+from uuid import UUID
+from src.queue.redis_conn import redis_conn
+
+STATUS_PREFIX = "webhook:"
+# Matches the delivery log retention window
+STATUS_TTL = 72 * 3600  # in seconds
+
+def _make_key(webhook_id: str) -> str:
+    return f"{STATUS_PREFIX}{webhook_id}"
+
+def _decode(value):
+    # The app connection decodes responses, raw connections return bytes
+    return value.decode() if isinstance(value, bytes) else value
+
+def record_attempt(row: dict) -> None:
+    """
+    Fold one logged delivery attempt into the webhook's status summary
+    (total count + latest outcome), in a single round-trip. Best-effort:
+    the status endpoint falls back to Postgres when the summary is missing.
+    """
+    record_attempts([row])
+
+def record_attempts(rows: list[dict]) -> None:
+    """
+    Like record_attempt, for several attempts in one pipeline. Rows must
+    carry the timestamp Postgres stored for them (see insert_logs), so
+    last_attempt_at matches the delivery log either way.
+    """
+    try:
+        pipe = redis_conn.pipeline()
+        for row in rows:
+            key = _make_key(str(row["webhook_id"]))
+            pipe.hincrby(key, "total", 1)
+            pipe.hset(key, mapping={
+                "subscription_id": str(row["subscription_id"]),
+                "last_ts": row["timestamp"].isoformat(),
+                "last_outcome": row["outcome"],
+                "last_code": "" if row["status_code"] is None else str(row["status_code"]),
+                "last_error": row["error"] or "",
+            })
+            pipe.expire(key, STATUS_TTL)
+        pipe.execute()
+    except Exception:
+        pass
+
+def get_webhook_summary(webhook_id: UUID | str) -> dict | None:
+    """
+    Return the cached status summary for a webhook, or None if there is
+    none (or Redis is unavailable).
+    """
+    try:
+        raw = redis_conn.hgetall(_make_key(str(webhook_id)))
+    except Exception:
+        return None
+    if not raw:
+        return None
+    data = {_decode(k): _decode(v) for k, v in raw.items()}
+    try:
+        return {
+            "subscription_id": UUID(data["subscription_id"]),
+            "total_attempts": int(data["total"]),
+            "final_outcome": data["last_outcome"],
+            "last_attempt_at": datetime.fromisoformat(data["last_ts"]),
+            "last_status_code": int(data["last_code"]) if data.get("last_code") else None,
+            "error": data.get("last_error") or None,
+        }
+    except (KeyError, ValueError):
+        # Partial or corrupted entry
+        return None
@@ -9,6 +9,38 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL is None:
     raise ValueError("DATABASE_URL environment variable not set")
 
-engine = create_engine(DATABASE_URL, echo=True)
+# Statement logging is for local debugging only; keep it off the hot path
+SQL_ECHO = os.getenv("SQL_ECHO") == "1"
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # in seconds
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=SQL_ECHO,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True,  # drop dead connections before handing them out
+    pool_recycle=DB_POOL_RECYCLE,
+    # Compiled-statement cache; large enough that the fixed set of hot
+    # queries is never evicted by ad-hoc ones
+    query_cache_size=5000,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+
+def get_db():
+    """
+    FastAPI dependency: one session per request, closed (and its connection
+    returned to the pool) when the response is done. Shared by all routers
+    so tests can override it in one place.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,68 @@
+"""
+Schema setup for databases the app does not migrate with a tool.
+
+Run once per deploy, before the new code serves traffic:
+
+    python -m src.db.upgrades
+
+or set AUTO_MIGRATE=1 on the API to do the same at startup.
+"""
+from sqlalchemy import text
+
+from src.db.session import Base, engine
+from src.models.subscription import Subscription
+from src.models.delivery_log import DeliveryLog
+
+# Arbitrary, fixed key for the transaction-level advisory lock that
+# serializes concurrent migrations (e.g. one per uvicorn worker)
+MIGRATION_LOCK_ID = 7_212_023
+
+# create_all only creates missing tables; it never adds or alters columns
+# or indexes on tables that already exist. These statements bring a database created
+# by an older release up to the current models. Each one is idempotent, so
+# they run on every AUTO_MIGRATE startup. Keep them in sync with the
+# "Upgrading an existing database" section of the README.
+SCHEMA_UPGRADES = (
+    # Per-subscription ingest rate limit (NULL = service default)
+    "ALTER TABLE subscriptions ADD COLUMN IF NOT EXISTS rate_limit_per_sec double precision",
+    "ALTER TABLE subscriptions ADD COLUMN IF NOT EXISTS rate_limit_burst integer",
+    # ETag source for subscription reads. The default backfills existing
+    # rows with the upgrade time; the app sets it on every write after that.
+    "ALTER TABLE subscriptions ADD COLUMN IF NOT EXISTS updated_at timestamp without time zone "
+    "NOT NULL DEFAULT (now() AT TIME ZONE 'utc')",
+    # Delivery logs are timestamped by Postgres; the worker no longer sends one
+    "ALTER TABLE delivery_logs ALTER COLUMN timestamp SET DEFAULT (clock_timestamp() AT TIME ZONE 'utc')",
+    # Status/attempts lookups (filter by id, newest first). The composite
+    # indexes cover every query the single-column ones served.
+    "CREATE INDEX IF NOT EXISTS ix_delivery_logs_webhook_id_timestamp "
+    "ON delivery_logs (webhook_id, timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_delivery_logs_subscription_id_timestamp "
+    "ON delivery_logs (subscription_id, timestamp DESC)",
+    "DROP INDEX IF EXISTS ix_delivery_logs_webhook_id",
+    "DROP INDEX IF EXISTS ix_delivery_logs_subscription_id",
+    # Lets the retention purge's timestamp < cutoff scan skip newer blocks
+    "CREATE INDEX IF NOT EXISTS ix_delivery_logs_timestamp_brin "
+    "ON delivery_logs USING brin (timestamp)",
+)
+
+
+def apply_schema_upgrades(conn) -> None:
+    """Run SCHEMA_UPGRADES on `conn`; the caller owns the transaction."""
+    for statement in SCHEMA_UPGRADES:
+        conn.execute(text(statement))
+
+
+def migrate() -> None:
+    """
+    Create missing tables and apply SCHEMA_UPGRADES in one transaction.
+    Callers that start at the same time take turns on an advisory lock, so
+    they never race on DDL; the later ones find nothing left to do.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        Base.metadata.create_all(bind=conn)
+        apply_schema_upgrades(conn)
+
+
+if __name__ == "__main__":
+    migrate()
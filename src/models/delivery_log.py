@@ -1,6 +1,5 @@
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, Text, Integer, DateTime
+from sqlalchemy import Column, Text, Integer, DateTime, Index, text
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from src.db.session import Base
 
@@ -16,17 +15,18 @@ class DeliveryLog(Base):
     webhook_id = Column(
         PG_UUID(as_uuid=True),
         nullable=False,
-        index=True,
     )
     subscription_id = Column(
         PG_UUID(as_uuid=True),
         nullable=False,
-        index=True,
     )
     target_url = Column(Text, nullable=False)
+    # Filled in by Postgres at insert time, on the same clock the retention
+    # purge uses. clock_timestamp() (not now()) so rows inserted in one
+    # batch still get distinct, ordered times.
     timestamp = Column(
         DateTime(timezone=False),
-        default=datetime.utcnow,
+        server_default=text("(clock_timestamp() AT TIME ZONE 'utc')"),
         nullable=False,
     )
     attempt_number = Column(Integer, nullable=False)
@@ -34,3 +34,14 @@ class DeliveryLog(Base):
     outcome = Column(Text, nullable=False)
     status_code = Column(Integer, nullable=True)
     error = Column(Text, nullable=True)
+
+    # Composite indexes match the status/attempts queries (filter by id,
+    # newest first), so both are served by an index range scan.
+    __table_args__ = (
+        Index("ix_delivery_logs_webhook_id_timestamp", webhook_id, timestamp.desc()),
+        Index("ix_delivery_logs_subscription_id_timestamp", subscription_id, timestamp.desc()),
+        # Rows are appended in timestamp order, so a BRIN index (a few pages
+        # of per-block min/max) is enough for the retention purge to skip
+        # everything newer than the cutoff.
+        Index("ix_delivery_logs_timestamp_brin", timestamp, postgresql_using="brin"),
+    )
@@ -1,5 +1,6 @@
 import uuid
-from sqlalchemy import Column, Text
+from datetime import datetime
+from sqlalchemy import Column, Text, Integer, Float, DateTime
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from src.db.session import Base
 
@@ -9,4 +10,14 @@ class Subscription(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     target_url = Column(Text, nullable=False)
     secret = Column(Text, nullable=True)
-    events = Column(ARRAY(Text), nullable=True)
\ No newline at end of file
+    events = Column(ARRAY(Text), nullable=True)
+    # Ingest rate limit (token bucket); NULL falls back to the service default
+    rate_limit_per_sec = Column(Float, nullable=True)
+    rate_limit_burst = Column(Integer, nullable=True)
+    # Bumped on every change; used to build the read endpoint's ETag
+    updated_at = Column(
+        DateTime(timezone=False),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+    )
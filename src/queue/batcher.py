@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import os
+
+from rq.queue import EnqueueData
+from starlette.concurrency import run_in_threadpool
+
+from src.queue import redis_conn as queue_module
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+BATCH_MAX_WAIT = float(os.getenv("INGEST_BATCH_WAIT_MS", "20")) / 1000  # in seconds
+
+_batch_queue: asyncio.Queue | None = None
+_flusher: asyncio.Task | None = None
+
+
+def _enqueue_batch(batch: list[EnqueueData]) -> None:
+    """Push a batch of prepared jobs onto the delivery queue in one pipeline."""
+    queue_module.delivery_queue.enqueue_many(batch)
+
+
+async def _fill(batch: list[EnqueueData]) -> None:
+    """
+    Add jobs to the batch until BATCH_MAX_SIZE is reached or BATCH_MAX_WAIT
+    has elapsed since the first one arrived.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BATCH_MAX_WAIT
+    while len(batch) < BATCH_MAX_SIZE:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(_batch_queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+
+
+async def _flush_loop() -> None:
+    while True:
+        batch = [await _batch_queue.get()]
+        try:
+            await _fill(batch)
+        finally:
+            # Also runs on shutdown, so a half-collected batch is not dropped
+            try:
+                await run_in_threadpool(_enqueue_batch, batch)
+            except Exception:
+                logger.exception(f"[Batcher] Failed to enqueue {len(batch)} job(s)")
+
+
+def start_batcher() -> None:
+    """Start the background flusher. Call once from the app's startup hook."""
+    global _batch_queue, _flusher
+    if _flusher is not None:
+        return
+    _batch_queue = asyncio.Queue()
+    _flusher = asyncio.create_task(_flush_loop())
+
+
+async def stop_batcher() -> None:
+    """Stop the flusher and enqueue whatever is still buffered."""
+    global _batch_queue, _flusher
+    if _flusher is None:
+        return
+    _flusher.cancel()
+    try:
+        await _flusher
+    except asyncio.CancelledError:
+        pass
+
+    pending = []
+    while not _batch_queue.empty():
+        pending.append(_batch_queue.get_nowait())
+    if pending:
+        await run_in_threadpool(_enqueue_batch, pending)
+
+    _batch_queue = None
+    _flusher = None
+
+
+async def submit(job_data: EnqueueData) -> None:
+    """
+    Hand a prepared job to the batcher. If the flusher is not running
+    (e.g. the app was started without its startup hooks), enqueue directly.
+    """
+    if _flusher is None:
+        await run_in_threadpool(_enqueue_batch, [job_data])
+        return
+    await _batch_queue.put(job_data)
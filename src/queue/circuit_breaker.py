@@ -0,0 +1,63 @@
+import os
+from src.queue.redis_conn import redis_conn
+
+CIRCUIT_OPEN_PREFIX = "circuit:open:"
+CIRCUIT_COUNT_PREFIX = "circuit:failures:"
+
+# More than CIRCUIT_FAILURE_THRESHOLD transient failures for one target
+# within CIRCUIT_WINDOW seconds opens its circuit for CIRCUIT_COOLDOWN seconds
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "10"))
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "60"))  # in seconds
+CIRCUIT_COOLDOWN = int(os.getenv("CIRCUIT_COOLDOWN", "60"))  # in seconds
+
+# Fixed-window failure counter; trips the breaker atomically server-side.
+# KEYS[1] = counter key, KEYS[2] = open flag key
+# ARGV[1] = window, ARGV[2] = threshold, ARGV[3] = cooldown
+# Returns 1 if this failure opened the circuit
+_RECORD_FAILURE_LUA = """
+local n = redis.call('INCR', KEYS[1])
+if n == 1 then
+  redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+if n > tonumber(ARGV[2]) then
+  redis.call('SET', KEYS[2], '1', 'EX', ARGV[3])
+  redis.call('DEL', KEYS[1])
+  return 1
+end
+return 0
+"""
+
+# Registered once; redis-py calls it via EVALSHA and reloads on NOSCRIPT
+_record_failure = redis_conn.register_script(_RECORD_FAILURE_LUA)
+
+def open_circuits(targets: list[str]) -> set[str]:
+    """
+    Return the subset of targets whose circuit is currently open, in one
+    round-trip. Fails closed (nothing open) if Redis is unavailable, so an
+    outage never stops deliveries.
+    """
+    if not targets:
+        return set()
+    try:
+        flags = redis_conn.mget([f"{CIRCUIT_OPEN_PREFIX}{t}" for t in targets])
+    except Exception:
+        return set()
+    return {target for target, flag in zip(targets, flags) if flag is not None}
+
+def is_open(target: str) -> bool:
+    return bool(open_circuits([target]))
+
+def record_failure(target: str) -> bool:
+    """
+    Count a transient failure (5xx, timeout, connection error) for a target.
+    Returns True if it opened the circuit.
+    """
+    try:
+        opened = _record_failure(
+            keys=[f"{CIRCUIT_COUNT_PREFIX}{target}", f"{CIRCUIT_OPEN_PREFIX}{target}"],
+            args=[CIRCUIT_WINDOW, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN],
+            client=redis_conn,
+        )
+    except Exception:
+        return False
+    return bool(opened)
@@ -0,0 +1,69 @@
+import os
+from uuid import UUID
+from src.queue.redis_conn import redis_conn
+
+RATE_LIMIT_PREFIX = "ratelimit:"
+
+# Defaults for subscriptions without their own limits
+DEFAULT_RATE_PER_SEC = float(os.getenv("INGEST_RATE_LIMIT_PER_SEC", "100"))
+DEFAULT_BURST = int(os.getenv("INGEST_RATE_LIMIT_BURST", "200"))
+
+# Token bucket kept in a Redis hash {tokens, ts}. Refill and take happen
+# atomically server-side, so all API workers share one bucket per key.
+# KEYS[1] = bucket key, ARGV[1] = capacity, ARGV[2] = refill rate (tokens/s)
+# Returns {allowed (0/1), seconds until a token is available}
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  retry_after = math.ceil((1 - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, retry_after}
+"""
+
+# Registered once; redis-py calls it via EVALSHA and reloads on NOSCRIPT
+_token_bucket = redis_conn.register_script(_TOKEN_BUCKET_LUA)
+
+def _make_key(subscription_id: str) -> str:
+    return f"{RATE_LIMIT_PREFIX}{subscription_id}"
+
+def consume(
+    subscription_id: UUID | str,
+    capacity: int = DEFAULT_BURST,
+    rate_per_sec: float = DEFAULT_RATE_PER_SEC,
+) -> tuple[bool, int]:
+    """
+    Take one token from the subscription's bucket.
+
+    Returns (allowed, retry_after_seconds). Fails open if Redis is
+    unavailable, so a cache outage never blocks ingestion.
+    """
+    try:
+        allowed, retry_after = _token_bucket(
+            keys=[_make_key(str(subscription_id))],
+            args=[capacity, rate_per_sec],
+            client=redis_conn,
+        )
+    except Exception:
+        return True, 0
+    return bool(allowed), int(retry_after)
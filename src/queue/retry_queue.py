@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from uuid import UUID
+
+import orjson
+from rq import Queue
+
+from src.queue import redis_conn as queue_module
+
+logger = logging.getLogger(__name__)
+
+# Delayed retries: a sorted set of encoded job arguments scored by the
+# epoch time they are due. Scheduling is a single ZADD (no RQ job to
+# pickle and register); a dispatcher moves due entries onto the queue.
+RETRY_ZSET = "webhook:retries"
+RETRY_POLL_INTERVAL = float(os.getenv("RETRY_POLL_INTERVAL", "1"))  # in seconds
+
+# Job function the retries are enqueued for (by path, like ingest does)
+DELIVERY_FUNC = "src.workers.delivery_worker.process_delivery"
+
+_dispatcher: threading.Thread | None = None
+
+
+def schedule_retry(
+    delay: timedelta,
+    subscription_id,
+    body: bytes,
+    content_type,
+    event_type,
+    signature,
+    webhook_id,
+    attempt,
+) -> None:
+    """
+    Schedule a delivery attempt to run after `delay`. The body was
+    validated as JSON at ingest, so it is UTF-8 and can travel as a string.
+    """
+    member = orjson.dumps([
+        str(subscription_id),
+        body.decode(),
+        content_type,
+        event_type,
+        signature,
+        str(webhook_id),
+        attempt,
+    ])
+    due = time.time() + delay.total_seconds()
+    queue_module.redis_conn.zadd(RETRY_ZSET, {member: due})
+
+
+def _job_args(member) -> tuple:
+    subscription_id, body, content_type, event_type, signature, webhook_id, attempt = orjson.loads(member)
+    return (
+        UUID(subscription_id),
+        body.encode(),
+        content_type,
+        event_type,
+        signature,
+        UUID(webhook_id),
+        attempt,
+    )
+
+
+def dispatch_due(now: float | None = None) -> int:
+    """
+    Move every retry that is due onto the delivery queue. Returns how many
+    were moved. Reading and removing happen in one MULTI/EXEC, so several
+    dispatchers (one per worker) never enqueue the same retry twice. If
+    enqueueing fails, the entries are put back with their original due
+    times for the next pass.
+    """
+    now = time.time() if now is None else now
+    pipe = queue_module.redis_conn.pipeline()
+    pipe.zrangebyscore(RETRY_ZSET, 0, now, withscores=True)
+    pipe.zremrangebyscore(RETRY_ZSET, 0, now)
+    due, _ = pipe.execute()
+    if not due:
+        return 0
+
+    jobs = []
+    for member, _ in due:
+        try:
+            jobs.append(Queue.prepare_data(DELIVERY_FUNC, args=_job_args(member)))
+        except (orjson.JSONDecodeError, ValueError):
+            logger.error(f"[Retries] Dropping malformed retry entry: {member!r}")
+    if jobs:
+        try:
+            queue_module.delivery_queue.enqueue_many(jobs)
+        except Exception:
+            queue_module.redis_conn.zadd(RETRY_ZSET, dict(due))
+            raise
+    return len(jobs)
+
+
+def start_retry_dispatcher() -> None:
+    """Start the background dispatcher thread. Call once per worker process."""
+    global _dispatcher
+    if _dispatcher is not None:
+        return
+
+    def _run():
+        while True:
+            try:
+                dispatch_due()
+            except Exception:
+                logger.exception("[Retries] Dispatch failed")
+            time.sleep(RETRY_POLL_INTERVAL)
+
+    _dispatcher = threading.Thread(target=_run, name="retry-dispatcher", daemon=True)
+    _dispatcher.start()
@@ -1,14 +1,18 @@
 import os
+import fakeredis
 import pytest
-import redis
 from rq import Queue
 
 # Decide whether to spin up testcontainers or trust env vars (CI)
 USE_TESTCONTAINERS = "CI" not in os.environ
 
+# Redis is in-process (see test_redis_conn); REDIS_URL only has to be set
+# for src.queue.redis_conn to import, and is never dialled. Set it here,
+# before test modules that import the app are collected.
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+
 if USE_TESTCONTAINERS:
     from testcontainers.postgres import PostgresContainer
-    from testcontainers.redis import RedisContainer
 
 
 @pytest.fixture(scope="session")
@@ -22,31 +26,15 @@ def postgres_container():
     yield pg
     pg.stop()
 
-@pytest.fixture(scope="session")
-def redis_container():
-    """Starts the Redis container if using testcontainers."""
-    if not USE_TESTCONTAINERS:
-        yield None
-        return
-    rr = RedisContainer("redis:6-alpine")
-    rr.start()
-    yield rr
-    rr.stop()
-
-
 @pytest.fixture(scope="session", autouse=True)
-def set_environment_urls(postgres_container, redis_container):
+def set_environment_urls(postgres_container):
     """
-    Sets DATABASE_URL and REDIS_URL environment variables based on
-    containers (if used) or assumes they exist (CI).
+    Sets DATABASE_URL based on the container (if used) or assumes it
+    exists (CI).
     Runs automatically for the session AFTER containers are started.
     """
     if postgres_container:
         os.environ["DATABASE_URL"] = postgres_container.get_connection_url()
-    if redis_container:
-        host = redis_container.get_container_host_ip()
-        port = redis_container.get_exposed_port(6379)
-        os.environ["REDIS_URL"] = f"redis://{host}:{port}/0"
 
 
 @pytest.fixture(scope="session")
@@ -66,22 +54,13 @@ def db_engine(set_environment_urls): # Depend on env vars being set
 
 
 @pytest.fixture(scope="session")
-def test_redis_conn(redis_container): # Depend on the container fixture
-    """Creates a Redis connection using the running test container or env URL."""
-    if redis_container:
-        host = redis_container.get_container_host_ip()
-        port = redis_container.get_exposed_port(6379)
-        redis_url = f"redis://{host}:{port}/0"
-    else:
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-
-    conn = redis.from_url(redis_url)
-    try:
-        conn.ping()
-    except redis.exceptions.ConnectionError as e:
-        pytest.fail(f"Redis connection failed: {e}") # Fail fast if Redis isn't up
-    conn.flushall()
-    return conn
+def test_redis_conn(set_environment_urls):
+    """
+    An in-process fakeredis server: no container or socket round-trips.
+    It implements the commands, pipelines, pub/sub and (via lupa) the Lua
+    scripts the app uses, so RQ and the cache run against it unchanged.
+    """
+    return fakeredis.FakeRedis()
 
 
 @pytest.fixture(scope="session")
@@ -109,15 +88,41 @@ def patch_redis_module(test_redis_conn, test_delivery_queue):
     orig_cache_conn = cache_module.redis_conn
     cache_module.redis_conn = test_redis_conn
 
+    # patch src.queue.rate_limit
+    from src.queue import rate_limit as rate_limit_module
+    orig_rate_limit_conn = rate_limit_module.redis_conn
+    rate_limit_module.redis_conn = test_redis_conn
+
+    # patch src.queue.circuit_breaker
+    from src.queue import circuit_breaker as circuit_breaker_module
+    orig_circuit_conn = circuit_breaker_module.redis_conn
+    circuit_breaker_module.redis_conn = test_redis_conn
+
+    # patch src.cache.webhook_status
+    from src.cache import webhook_status as status_cache_module
+    orig_status_conn = status_cache_module.redis_conn
+    status_cache_module.redis_conn = test_redis_conn
+
     yield
 
     # restore
     queue_module.redis_conn = orig_queue_conn
     queue_module.delivery_queue = orig_queue_queue
     cache_module.redis_conn = orig_cache_conn
+    rate_limit_module.redis_conn = orig_rate_limit_conn
+    status_cache_module.redis_conn = orig_status_conn
+    circuit_breaker_module.redis_conn = orig_circuit_conn
 
 
 
+@pytest.fixture(autouse=True)
+def clear_subscription_l1():
+    """Start every test with an empty in-process subscription cache."""
+    from src.cache.subscription_cache import clear_local_cache
+    clear_local_cache()
+    yield
+
+
 @pytest.fixture(scope="function")
 def db_session(db_engine):
     """Provides a transactional session for tests."""
@@ -160,8 +165,7 @@ def client(db_session): # Depends on db_session -> db_engine -> set_env -> conta
     # Import app and get_db functions here, after engine/session might be configured
     from fastapi.testclient import TestClient
     from src.api.main import app
-    from src.api.routes.subscriptions import get_db as subs_get_db
-    from src.api.routes.status import get_db as status_get_db
+    from src.db.session import get_db
 
     def override_get_db():
         try:
@@ -169,8 +173,7 @@ def client(db_session): # Depends on db_session -> db_engine -> set_env -> conta
         finally:
             pass # Session managed by db_session fixture
 
-    app.dependency_overrides[subs_get_db] = override_get_db
-    app.dependency_overrides[status_get_db] = override_get_db
+    app.dependency_overrides[get_db] = override_get_db
 
     yield TestClient(app)
 
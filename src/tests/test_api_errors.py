@@ -1,6 +1,7 @@
+import hashlib
+import hmac
 import uuid
 import pytest
-import json # Import json
 
 # Import cache functions and redis_conn fixture
 from src.cache.subscription_cache import cache_subscription, _make_key
@@ -65,14 +66,8 @@ def test_ingest_invalid_json_body(client, redis_conn): # Use redis_conn fixture
     """Test POST /ingest with non-JSON data."""
     # 1) Manually prepare subscription data and cache it
     sub_id = uuid.uuid4()
-    sub_data = {
-        "id": str(sub_id),
-        "target_url": "http://valid-sub.com",
-        "secret": None,
-        "events": [],
-    }
     cache_key = _make_key(str(sub_id))
-    redis_conn.set(cache_key, json.dumps(sub_data)) # Use test's redis_conn
+    redis_conn.hset(cache_key, mapping={"target_url": "http://valid-sub.com"}) # Use test's redis_conn
 
     # 2) Send invalid JSON body
     r = client.post(
@@ -82,4 +77,91 @@ def test_ingest_invalid_json_body(client, redis_conn): # Use redis_conn fixture
     )
     assert r.status_code == 400              # JSON decode error
     assert "detail" in r.json()
-    assert "invalid json body" in r.json()["detail"].lower()
\ No newline at end of file
+    assert "invalid json body" in r.json()["detail"].lower()
+
+def test_ingest_rate_limited(client):
+    """Test POST /ingest returns 429 once the subscription's bucket is empty."""
+    payload = {
+        "target_url": "http://rate-limited.com",
+        "rate_limit_per_sec": 0.01,
+        "rate_limit_burst": 1,
+    }
+    r = client.post("/subscriptions/", json=payload)
+    assert r.status_code == 201
+    sub_id = r.json()["id"]
+
+    r = client.post(f"/ingest/{sub_id}", json={"data": 1})
+    assert r.status_code == 202
+
+    r = client.post(f"/ingest/{sub_id}", json={"data": 2})
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) > 0
+    assert r.headers["RateLimit-Limit"] == "1"
+
+def test_ingest_forged_requests_do_not_drain_rate_limit(client):
+    """Test unsigned requests to a secret-protected subscription are rejected before the bucket is charged."""
+    payload = {
+        "target_url": "http://rate-limited-signed.com",
+        "secret": "s3cr3t",
+        "rate_limit_per_sec": 0.01,
+        "rate_limit_burst": 1,
+    }
+    r = client.post("/subscriptions/", json=payload)
+    assert r.status_code == 201
+    sub_id = r.json()["id"]
+
+    body = b'{"data": 1}'
+    for _ in range(3):
+        r = client.post(f"/ingest/{sub_id}", content=body, headers={"X-Signature": "sha256=" + "0" * 64})
+        assert r.status_code == 401
+
+    # The legitimate sender still has its whole burst
+    digest = hmac.new(b"s3cr3t", body, hashlib.sha256).hexdigest()
+    r = client.post(f"/ingest/{sub_id}", content=body, headers={"X-Signature": digest})
+    assert r.status_code == 202
+
+
+def test_ingest_signature_required_when_secret_set(client):
+    """Test POST /ingest rejects unsigned or badly signed bodies for a secret-protected subscription."""
+    payload = {"target_url": "http://signed-sub.com", "secret": "s3cr3t"}
+    r = client.post("/subscriptions/", json=payload)
+    assert r.status_code == 201
+    sub_id = r.json()["id"]
+
+    body = b'{"data": 123}'
+    headers = {"Content-Type": "application/json"}
+
+    # Missing signature
+    r = client.post(f"/ingest/{sub_id}", content=body, headers=headers)
+    assert r.status_code == 401
+
+    # Wrong signature
+    r = client.post(
+        f"/ingest/{sub_id}",
+        content=body,
+        headers={**headers, "X-Signature": "sha256=" + "0" * 64},
+    )
+    assert r.status_code == 401
+
+    # Non-ASCII signature
+    r = client.post(
+        f"/ingest/{sub_id}",
+        content=body,
+        headers={**headers, "X-Signature": b"sha256=\xe9" + b"0" * 63},
+    )
+    assert r.status_code == 401
+
+    # Correct signature
+    digest = hmac.new(b"s3cr3t", body, hashlib.sha256).hexdigest()
+    r = client.post(
+        f"/ingest/{sub_id}",
+        content=body,
+        headers={**headers, "X-Signature": f"sha256={digest}"},
+    )
+    assert r.status_code == 202
+
+def test_health_check(client):
+    """Test the health endpoint used by deployment probes."""
+    r = client.get("/health")
+    assert r.status_code == 200
+    assert r.json() == {"status": "ok"}
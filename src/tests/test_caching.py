@@ -1,4 +1,3 @@
-import json
 import uuid
 import pytest
 
@@ -33,9 +32,7 @@ def test_cache_population_on_miss(client, db_session, redis_conn):
 
     # 5. Verify cache was populated
     assert redis_conn.exists(cache_key) == 1
-    cached_raw = redis_conn.get(cache_key)
-    cached_data = json.loads(cached_raw)
-    assert cached_data["target_url"] == sub.target_url
+    assert redis_conn.hget(cache_key, "target_url").decode() == sub.target_url
 
 def test_cache_hit(client, db_session, redis_conn, mocker):
     """Verify DB is not hit when cache is warm."""
@@ -76,10 +73,9 @@ def test_cache_invalidation_on_update(client, db_session, redis_conn):
     cache_key = _make_key(sub_id)
 
     # 2. Verify initial cache state
-    cached_raw = redis_conn.get(cache_key)
-    cached_data = json.loads(cached_raw)
-    assert cached_data["target_url"] == payload["target_url"]
-    assert cached_data["secret"] == payload["secret"]
+    cached_data = redis_conn.hgetall(cache_key)
+    assert cached_data[b"target_url"].decode() == payload["target_url"]
+    assert cached_data[b"secret"].decode() == payload["secret"]
 
     # 3. Update subscription via API
     update_payload = {"target_url": "http://new-url.org/", "secret": "new"}
@@ -87,11 +83,10 @@ def test_cache_invalidation_on_update(client, db_session, redis_conn):
     assert r.status_code == 200
 
     # 4. Verify cache reflects the update
-    cached_raw_updated = redis_conn.get(cache_key)
-    assert cached_raw_updated is not None # Should still exist
-    cached_data_updated = json.loads(cached_raw_updated)
-    assert cached_data_updated["target_url"] == update_payload["target_url"]
-    assert cached_data_updated["secret"] == update_payload["secret"]
+    cached_data_updated = redis_conn.hgetall(cache_key)
+    assert cached_data_updated # Should still exist
+    assert cached_data_updated[b"target_url"].decode() == update_payload["target_url"]
+    assert cached_data_updated[b"secret"].decode() == update_payload["secret"]
 
     # 5. Verify get_subscription also returns updated data (without DB hit ideally)
     retrieved_data = get_subscription(sub_id)
@@ -121,3 +116,39 @@ def test_cache_invalidation_on_delete(client, db_session, redis_conn):
     retrieved_data = get_subscription(sub_id)
     assert retrieved_data is None
 
+
+
+def test_local_cache_serves_repeat_lookups(client, db_session, redis_conn):
+    """Verify repeat lookups are served in-process without touching Redis."""
+    payload = {"target_url": "http://l1-cache-test.com/"}
+    r = client.post("/subscriptions/", json=payload)
+    assert r.status_code == 201
+    sub_id = r.json()["id"]
+
+    # 1. First lookup reads Redis and fills the local cache
+    assert get_subscription(sub_id)["target_url"] == payload["target_url"]
+
+    # 2. With the Redis entry gone, the local copy still answers
+    redis_conn.delete(_make_key(sub_id))
+    assert get_subscription(sub_id)["target_url"] == payload["target_url"]
+
+    # 3. Invalidation evicts the local copy too
+    invalidate_subscription(sub_id)
+    assert get_subscription(sub_id, db=db_session) is not None  # reloaded from the DB
+    assert redis_conn.exists(_make_key(sub_id)) == 1
+
+def test_cache_hit_refreshes_ttl(client, redis_conn):
+    """Verify Redis entries expire and a hit slides the expiry forward."""
+    from src.cache.subscription_cache import REDIS_TTL, clear_local_cache
+
+    r = client.post("/subscriptions/", json={"target_url": "http://cache-ttl-test.com/"})
+    assert r.status_code == 201
+    sub_id = r.json()["id"]
+    cache_key = _make_key(sub_id)
+
+    assert 0 < redis_conn.ttl(cache_key) <= REDIS_TTL
+
+    redis_conn.expire(cache_key, 10)
+    clear_local_cache()  # force the lookup through to Redis
+    assert get_subscription(sub_id) is not None
+    assert redis_conn.ttl(cache_key) > 10
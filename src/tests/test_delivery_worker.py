@@ -9,18 +9,26 @@ from src.workers.delivery_worker import (
     process_delivery,
     MAX_ATTEMPTS,
     BACKOFF_SCHEDULE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_TIMEOUT,
 )
 from src.models.subscription import Subscription
 from src.models.delivery_log import DeliveryLog
 from src.cache.subscription_cache import cache_subscription
-from src.queue.redis_conn import delivery_queue
 
 # --- Test Data ---
 TEST_URL = "http://test-target.local"
-TEST_PAYLOAD = {"message": "hello"}
+TEST_BODY = b'{"message": "hello"}'
+TEST_CONTENT_TYPE = "application/json"
 TEST_EVENT_TYPE = "test.event"
 TEST_SIGNATURE = "sha256=test"
 
+@pytest.fixture(autouse=True)
+def reset_circuit(redis_conn):
+    """Failures from earlier tests must not trip the breaker for TEST_URL."""
+    from src.queue.circuit_breaker import CIRCUIT_COUNT_PREFIX, CIRCUIT_OPEN_PREFIX
+    redis_conn.delete(f"{CIRCUIT_COUNT_PREFIX}{TEST_URL}", f"{CIRCUIT_OPEN_PREFIX}{TEST_URL}")
+
 @pytest.fixture
 def test_sub(db_session):
     """Creates a subscription and caches it for worker tests."""
@@ -38,20 +46,23 @@ def test_process_delivery_success(
     webhook_id = uuid.uuid4()
     subscription_id = test_sub.id
 
-    # Mock requests.post to return a successful response
+    # Mock the worker session's post to return a successful response
     mock_response = MagicMock(spec=requests.Response)
     mock_response.status_code = 200
-    mocker.patch("requests.post", return_value=mock_response)
+    mock_post = mocker.patch(
+        "src.workers.delivery_worker._session.post", return_value=mock_response
+    )
 
-    # Mock the enqueue_in method (it shouldn't be called on success)
-    mock_enqueue_in = mocker.patch(
-        "src.queue.redis_conn.delivery_queue.enqueue_in"
+    # Mock retry scheduling (it shouldn't be called on success)
+    mock_schedule_retry = mocker.patch(
+        "src.workers.delivery_worker.schedule_retry"
     )
 
     # Execute the worker function
     process_delivery(
         subscription_id=subscription_id,
-        payload=TEST_PAYLOAD,
+        body=TEST_BODY,
+        content_type=TEST_CONTENT_TYPE,
         event_type=TEST_EVENT_TYPE,
         signature=TEST_SIGNATURE,
         webhook_id=webhook_id,
@@ -59,12 +70,12 @@ def test_process_delivery_success(
     )
 
     # Assertions
-    # 1. requests.post was called correctly
-    requests.post.assert_called_once_with(
+    # 1. post was called correctly
+    mock_post.assert_called_once_with(
         TEST_URL,
-        json=TEST_PAYLOAD,
+        data=TEST_BODY,
         headers={
-            "Content-Type": "application/json",
+            "Content-Type": TEST_CONTENT_TYPE,
             "X-Event-Type": TEST_EVENT_TYPE,
             "X-Signature": TEST_SIGNATURE, # Assuming signature is passed through
         },
@@ -72,7 +83,7 @@ def test_process_delivery_success(
     )
 
     # 2. No retry was scheduled
-    mock_enqueue_in.assert_not_called()
+    mock_schedule_retry.assert_not_called()
 
     # 3. Success log entry was created
     log = db_session.query(DeliveryLog).filter_by(webhook_id=webhook_id).one()
@@ -90,25 +101,28 @@ def test_process_delivery_retry_on_failure(
     subscription_id = test_sub.id
     initial_attempt = 1
 
-    # Mock requests.post to return a server error
+    # Mock the worker session's post to return a server error
     mock_response = MagicMock(spec=requests.Response)
     mock_response.status_code = 503
     # Raise exception for non-2xx status codes to mimic requests behavior
     mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(
         "Service Unavailable", response=mock_response
     )
-    mocker.patch("requests.post", return_value=mock_response)
+    mock_post = mocker.patch(
+        "src.workers.delivery_worker._session.post", return_value=mock_response
+    )
 
-    # Mock the enqueue_in method to capture arguments
-    mock_enqueue_in = mocker.patch(
-        "src.queue.redis_conn.delivery_queue.enqueue_in"
+    # Mock retry scheduling to capture arguments
+    mock_schedule_retry = mocker.patch(
+        "src.workers.delivery_worker.schedule_retry"
     )
 
     # Execute the worker function for the first attempt
     # It should raise the exception internally but handle it for retry
     process_delivery(
         subscription_id=subscription_id,
-        payload=TEST_PAYLOAD,
+        body=TEST_BODY,
+        content_type=TEST_CONTENT_TYPE,
         event_type=TEST_EVENT_TYPE,
         signature=TEST_SIGNATURE,
         webhook_id=webhook_id,
@@ -116,16 +130,16 @@ def test_process_delivery_retry_on_failure(
     )
 
     # Assertions
-    # 1. requests.post was called
-    requests.post.assert_called_once()
+    # 1. post was called
+    mock_post.assert_called_once()
 
     # 2. Retry *was* scheduled with correct parameters
     expected_delay = timedelta(seconds=BACKOFF_SCHEDULE[initial_attempt - 1])
-    mock_enqueue_in.assert_called_once_with(
+    mock_schedule_retry.assert_called_once_with(
         expected_delay,
-        process_delivery, # The function itself
         subscription_id,
-        TEST_PAYLOAD,
+        TEST_BODY,
+        TEST_CONTENT_TYPE,
         TEST_EVENT_TYPE,
         TEST_SIGNATURE,
         webhook_id,
@@ -148,14 +162,14 @@ def test_process_delivery_retry_on_timeout(
     subscription_id = test_sub.id
     initial_attempt = 2 # Simulate a later attempt
 
-    # Mock requests.post to raise a Timeout exception
-    mocker.patch(
-        "requests.post",
+    # Mock the worker session's post to raise a Timeout exception
+    mock_post = mocker.patch(
+        "src.workers.delivery_worker._session.post",
         side_effect=requests.exceptions.Timeout("Connection timed out")
     )
 
-    mock_enqueue_in = mocker.patch(
-        "src.workers.delivery_worker.delivery_queue.enqueue_in"
+    mock_schedule_retry = mocker.patch(
+        "src.workers.delivery_worker.schedule_retry"
     )
     
     # Mock get_subscription to avoid Redis dependency
@@ -172,7 +186,8 @@ def test_process_delivery_retry_on_timeout(
     # Execute the worker function
     process_delivery(
         subscription_id=subscription_id,
-        payload=TEST_PAYLOAD,
+        body=TEST_BODY,
+        content_type=TEST_CONTENT_TYPE,
         event_type=TEST_EVENT_TYPE,
         signature=TEST_SIGNATURE,
         webhook_id=webhook_id,
@@ -180,16 +195,17 @@ def test_process_delivery_retry_on_timeout(
     )
 
     # Assertions
-    # 1. requests.post was called
-    requests.post.assert_called_once()
+    # 1. post was called, with separate connect and read timeouts
+    mock_post.assert_called_once()
+    assert mock_post.call_args.kwargs["timeout"] == (HTTP_CONNECT_TIMEOUT, HTTP_TIMEOUT)
 
     # 2. Retry was scheduled
     expected_delay = timedelta(seconds=BACKOFF_SCHEDULE[initial_attempt - 1])
-    mock_enqueue_in.assert_called_once_with(
+    mock_schedule_retry.assert_called_once_with(
         expected_delay,
-        process_delivery,
         subscription_id,
-        TEST_PAYLOAD,
+        TEST_BODY,
+        TEST_CONTENT_TYPE,
         TEST_EVENT_TYPE,
         TEST_SIGNATURE,
         webhook_id,
@@ -212,13 +228,15 @@ def test_process_delivery_retry_on_failure(
     subscription_id = test_sub.id
     initial_attempt = 1
 
-    # Mock requests.post to return a server error
+    # Mock the worker session's post to return a server error
     mock_response = MagicMock(spec=requests.Response)
     mock_response.status_code = 503
-    mocker.patch("requests.post", return_value=mock_response)
+    mock_post = mocker.patch(
+        "src.workers.delivery_worker._session.post", return_value=mock_response
+    )
 
-    mock_enqueue_in = mocker.patch(
-        "src.workers.delivery_worker.delivery_queue.enqueue_in"
+    mock_schedule_retry = mocker.patch(
+        "src.workers.delivery_worker.schedule_retry"
     )
 
     # Mock get_subscription to avoid Redis dependency
@@ -235,7 +253,8 @@ def test_process_delivery_retry_on_failure(
     # Execute the worker function for the first attempt
     process_delivery(
         subscription_id=subscription_id,
-        payload=TEST_PAYLOAD,
+        body=TEST_BODY,
+        content_type=TEST_CONTENT_TYPE,
         event_type=TEST_EVENT_TYPE,
         signature=TEST_SIGNATURE,
         webhook_id=webhook_id,
@@ -243,14 +262,14 @@ def test_process_delivery_retry_on_failure(
     )
 
     # Assertions
-    # 1. requests.post was called
-    requests.post.assert_called_once()
+    # 1. post was called
+    mock_post.assert_called_once()
 
     # 2. Retry was scheduled
-    mock_enqueue_in.assert_called_once()
+    mock_schedule_retry.assert_called_once()
     
     # Check retry args
-    args = mock_enqueue_in.call_args[0]
+    args = mock_schedule_retry.call_args[0]
     assert args[7] == initial_attempt + 1
     
     # 3. Log entry was created
@@ -259,4 +278,314 @@ def test_process_delivery_retry_on_failure(
     assert log.attempt_number == initial_attempt
     assert log.outcome == "Failed Attempt"
     assert log.status_code == 503
-    assert "HTTP 503" in log.error
\ No newline at end of file
+    assert "HTTP 503" in log.error
+
+def test_process_delivery_final_attempt_fails(
+    test_sub, db_session, delivery_queue, mocker
+):
+    """Test an error on the last attempt: one "Failure" row, no retry."""
+    webhook_id = uuid.uuid4()
+    subscription_id = test_sub.id
+
+    mocker.patch(
+        "src.workers.delivery_worker._session.post",
+        side_effect=requests.exceptions.ConnectionError("Connection refused")
+    )
+    mock_schedule_retry = mocker.patch(
+        "src.workers.delivery_worker.schedule_retry"
+    )
+
+    process_delivery(
+        subscription_id=subscription_id,
+        body=TEST_BODY,
+        content_type=TEST_CONTENT_TYPE,
+        event_type=TEST_EVENT_TYPE,
+        signature=TEST_SIGNATURE,
+        webhook_id=webhook_id,
+        attempt=MAX_ATTEMPTS,
+    )
+
+    mock_schedule_retry.assert_not_called()
+    log = db_session.query(DeliveryLog).filter_by(webhook_id=webhook_id).one()
+    assert log.attempt_number == MAX_ATTEMPTS
+    assert log.outcome == "Failure"
+    assert log.status_code is None
+    assert "Connection refused" in log.error
+
+def test_delivery_worker_starts_invalidation_listener(delivery_queue, mocker):
+    """The RQ worker class keeps its local subscription cache coherent."""
+    from rq.worker import SimpleWorker
+    from src.workers import rq_worker
+
+    mock_listener = mocker.patch.object(rq_worker, "start_invalidation_listener")
+    mock_log_writer = mocker.patch.object(rq_worker, "start_log_writer")
+    mock_dispatcher = mocker.patch.object(rq_worker, "start_retry_dispatcher")
+    mock_work = mocker.patch.object(SimpleWorker, "work", return_value=True)
+
+    worker = rq_worker.DeliveryWorker([delivery_queue], connection=delivery_queue.connection)
+    assert worker.work(burst=True) is True
+
+    mock_listener.assert_called_once()
+    mock_log_writer.assert_called_once()
+    mock_dispatcher.assert_called_once()
+    mock_work.assert_called_once_with(burst=True)
+
+def test_log_writer_batches_rows(test_sub, db_session, mocker):
+    """With the writer running, rows are buffered until the next flush."""
+    from src.workers import log_writer
+
+    # Pretend the background thread is running so rows are buffered
+    mocker.patch.object(log_writer, "_flusher", object())
+    webhook_id = uuid.uuid4()
+    for attempt in (1, 2):
+        log_writer.write_log({
+            "webhook_id": webhook_id,
+            "subscription_id": test_sub.id,
+            "target_url": TEST_URL,
+            "attempt_number": attempt,
+            "outcome": "Failed Attempt",
+            "status_code": 503,
+            "error": "HTTP 503",
+        })
+
+    assert db_session.query(DeliveryLog).filter_by(webhook_id=webhook_id).count() == 0
+    log_writer.flush_logs()
+    logs = (
+        db_session.query(DeliveryLog)
+        .filter_by(webhook_id=webhook_id)
+        .order_by(DeliveryLog.attempt_number)
+        .all()
+    )
+    assert len(logs) == 2
+    # Stamped by Postgres, distinct even within one batch
+    assert logs[0].timestamp < logs[1].timestamp
+
+def test_log_writer_retries_failed_flush(test_sub, db_session, mocker):
+    """Rows from a failed insert stay buffered (up to a cap) for the next flush."""
+    from src.workers import log_writer
+
+    mocker.patch.object(log_writer, "_flusher", object())
+    mocker.patch.object(log_writer, "LOG_BUFFER_MAX", 2)
+    webhook_id = uuid.uuid4()
+    for attempt in (1, 2, 3):
+        log_writer.write_log({
+            "webhook_id": webhook_id,
+            "subscription_id": test_sub.id,
+            "target_url": TEST_URL,
+            "attempt_number": attempt,
+            "outcome": "Failed Attempt",
+            "status_code": 503,
+            "error": "HTTP 503",
+        })
+
+    insert = log_writer.insert_logs
+    mocker.patch.object(log_writer, "insert_logs", side_effect=ConnectionError("db down"))
+    log_writer.flush_logs()
+    assert db_session.query(DeliveryLog).filter_by(webhook_id=webhook_id).count() == 0
+
+    # Database back: the newest rows that fit under the cap are written
+    log_writer.insert_logs.side_effect = insert
+    log_writer.flush_logs()
+    attempts = [
+        log.attempt_number
+        for log in db_session.query(DeliveryLog).filter_by(webhook_id=webhook_id)
+    ]
+    assert sorted(attempts) == [2, 3]
+
+def test_async_consumer_delivers_batch(test_sub, db_session, delivery_queue, mocker):
+    """The asyncio consumer POSTs a batch concurrently and logs each attempt."""
+    import asyncio
+    import httpx
+    from src.workers import delivery_worker_async
+
+    mock_schedule_retry = mocker.patch(
+        "src.workers.delivery_worker.schedule_retry"
+    )
+    ok_id, failing_id = uuid.uuid4(), uuid.uuid4()
+    for webhook_id, event_type in ((ok_id, "ok"), (failing_id, "fail")):
+        delivery_queue.enqueue(
+            delivery_worker_async.DELIVERY_FUNC,
+            args=(test_sub.id, TEST_BODY, TEST_CONTENT_TYPE, event_type, TEST_SIGNATURE, webhook_id, 1),
+        )
+
+    seen = []
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200 if request.headers["X-Event-Type"] == "ok" else 503)
+
+    async def run_batch():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await delivery_worker_async.process_batch(client, delivery_queue, timeout=0)
+
+    assert asyncio.run(run_batch()) == 2
+    assert delivery_queue.count == 0
+    assert {r.content for r in seen} == {TEST_BODY}
+
+    ok_log = db_session.query(DeliveryLog).filter_by(webhook_id=ok_id).one()
+    assert ok_log.outcome == "Success"
+    failed_log = db_session.query(DeliveryLog).filter_by(webhook_id=failing_id).one()
+    assert failed_log.outcome == "Failed Attempt"
+    assert failed_log.status_code == 503
+
+    # Only the failed delivery is retried, with the same job arguments
+    mock_schedule_retry.assert_called_once()
+    assert mock_schedule_retry.call_args[0][6] == failing_id
+    assert mock_schedule_retry.call_args[0][7] == 2
+
+def test_async_consumer_requeues_batch_on_failure(test_sub, delivery_queue, mocker):
+    """A batch that fails part-way goes back on the queue instead of being lost."""
+    import asyncio
+    import httpx
+    from src.workers import delivery_worker_async
+
+    job_ids = [
+        delivery_queue.enqueue(
+            delivery_worker_async.DELIVERY_FUNC,
+            args=(test_sub.id, TEST_BODY, TEST_CONTENT_TYPE, None, None, uuid.uuid4(), 1),
+        ).id
+        for _ in range(3)
+    ]
+    mocker.patch.object(delivery_worker_async, "get_subscription", side_effect=RuntimeError("db down"))
+
+    async def run_batch():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(200))) as client:
+            return await delivery_worker_async.process_batch(client, delivery_queue, timeout=0)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_batch())
+    # Back at the front of the queue, in order
+    assert delivery_queue.job_ids == job_ids
+
+def test_async_consumer_fails_malformed_job(test_sub, db_session, delivery_queue):
+    """One job with bad args goes to the failed registry; the rest still deliver."""
+    import asyncio
+    import httpx
+    from src.workers import delivery_worker_async
+
+    bad = delivery_queue.enqueue(delivery_worker_async.DELIVERY_FUNC, args=(test_sub.id, TEST_BODY))
+    webhook_id = uuid.uuid4()
+    delivery_queue.enqueue(
+        delivery_worker_async.DELIVERY_FUNC,
+        args=(test_sub.id, TEST_BODY, TEST_CONTENT_TYPE, None, None, webhook_id, 1),
+    )
+
+    async def run_batch():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(200))) as client:
+            return await delivery_worker_async.process_batch(client, delivery_queue, timeout=0)
+
+    assert asyncio.run(run_batch()) == 2
+    assert delivery_queue.count == 0
+    assert bad.id in delivery_queue.failed_job_registry.get_job_ids()
+    assert db_session.query(DeliveryLog).filter_by(webhook_id=webhook_id).one().outcome == "Success"
+
+@pytest.mark.parametrize("status_code, retried", [(404, False), (410, False), (429, True), (500, True)])
+def test_process_delivery_permanent_4xx_not_retried(
+    test_sub, db_session, delivery_queue, mocker, status_code, retried
+):
+    """4xx responses (other than 408/429) fail at once instead of retrying."""
+    webhook_id = uuid.uuid4()
+    mock_response = MagicMock(spec=requests.Response)
+    mock_response.status_code = status_code
+    mocker.patch(
+        "src.workers.delivery_worker._session.post", return_value=mock_response
+    )
+    mock_schedule_retry = mocker.patch(
+        "src.workers.delivery_worker.schedule_retry"
+    )
+
+    process_delivery(
+        subscription_id=test_sub.id,
+        body=TEST_BODY,
+        content_type=TEST_CONTENT_TYPE,
+        event_type=TEST_EVENT_TYPE,
+        signature=TEST_SIGNATURE,
+        webhook_id=webhook_id,
+        attempt=1,
+    )
+
+    assert mock_schedule_retry.called == retried
+    log = db_session.query(DeliveryLog).filter_by(webhook_id=webhook_id).one()
+    assert log.outcome == ("Failed Attempt" if retried else "Failure")
+    assert log.status_code == status_code
+
+def test_circuit_breaker_skips_failing_target(test_sub, db_session, delivery_queue, mocker):
+    """After enough transient failures the target is skipped until cooldown."""
+    from src.queue import circuit_breaker
+
+    mocker.patch.object(circuit_breaker, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    mock_response = MagicMock(spec=requests.Response)
+    mock_response.status_code = 503
+    mock_post = mocker.patch(
+        "src.workers.delivery_worker._session.post", return_value=mock_response
+    )
+    mock_schedule_retry = mocker.patch(
+        "src.workers.delivery_worker.schedule_retry"
+    )
+
+    webhook_ids = [uuid.uuid4() for _ in range(4)]
+    for webhook_id in webhook_ids:
+        process_delivery(
+            subscription_id=test_sub.id,
+            body=TEST_BODY,
+            content_type=TEST_CONTENT_TYPE,
+            event_type=TEST_EVENT_TYPE,
+            signature=TEST_SIGNATURE,
+            webhook_id=webhook_id,
+            attempt=1,
+        )
+
+    # The third failure opened the circuit, so the fourth never hit the network
+    assert mock_post.call_count == 3
+    assert circuit_breaker.is_open(TEST_URL)
+    skipped = db_session.query(DeliveryLog).filter_by(webhook_id=webhook_ids[3]).one()
+    assert skipped.outcome == "Failed Attempt"
+    assert skipped.error == "Circuit open"
+    assert skipped.status_code is None
+    # Every attempt, skipped or not, is rescheduled
+    assert mock_schedule_retry.call_count == 4
+
+def test_retry_dispatcher_moves_due_retries(redis_conn, delivery_queue):
+    """Retries wait in the sorted set until due, then become queue jobs."""
+    import time
+    from src.queue.retry_queue import RETRY_ZSET, schedule_retry, dispatch_due
+
+    redis_conn.delete(RETRY_ZSET)
+
+    sub_id, webhook_id = uuid.uuid4(), uuid.uuid4()
+    schedule_retry(
+        timedelta(seconds=30), sub_id, TEST_BODY, TEST_CONTENT_TYPE,
+        TEST_EVENT_TYPE, TEST_SIGNATURE, webhook_id, 2,
+    )
+
+    assert dispatch_due() == 0
+    assert delivery_queue.count == 0
+
+    assert dispatch_due(now=time.time() + 31) == 1
+    assert dispatch_due(now=time.time() + 31) == 0  # moved exactly once
+    job = delivery_queue.jobs[0]
+    assert job.func_name == "src.workers.delivery_worker.process_delivery"
+    assert job.args == (
+        sub_id, TEST_BODY, TEST_CONTENT_TYPE, TEST_EVENT_TYPE,
+        TEST_SIGNATURE, webhook_id, 2,
+    )
+
+def test_retry_dispatcher_keeps_retries_when_enqueue_fails(redis_conn, delivery_queue, mocker):
+    """Due retries go back into the sorted set, with their due time, if enqueueing fails."""
+    import time
+    from src.queue.retry_queue import RETRY_ZSET, schedule_retry, dispatch_due
+
+    redis_conn.delete(RETRY_ZSET)
+    schedule_retry(
+        timedelta(seconds=30), uuid.uuid4(), TEST_BODY, TEST_CONTENT_TYPE,
+        TEST_EVENT_TYPE, TEST_SIGNATURE, uuid.uuid4(), 2,
+    )
+    [(member, due_at)] = redis_conn.zrange(RETRY_ZSET, 0, -1, withscores=True)
+
+    mocker.patch.object(delivery_queue, "enqueue_many", side_effect=ConnectionError("redis blip"))
+    with pytest.raises(ConnectionError):
+        dispatch_due(now=time.time() + 31)
+    assert redis_conn.zrange(RETRY_ZSET, 0, -1, withscores=True) == [(member, due_at)]
+
+    mocker.stopall()
+    assert dispatch_due(now=time.time() + 31) == 1
+    assert delivery_queue.count == 1
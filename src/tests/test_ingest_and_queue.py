@@ -18,3 +18,61 @@ def test_ingest_enqueues_job(client, delivery_queue):
 
     # Exactly one job in the queue
     assert delivery_queue.count == 1
+
+    # The raw body and its content type are forwarded as-is
+    job = delivery_queue.jobs[0]
+    assert job.args[1] == r.request.content
+    assert job.args[2] == "application/json"
+
+
+def test_ingest_batches_jobs_while_app_running(client, delivery_queue):
+    # Create subscription
+    payload = {"target_url": "https://example.com/hook"}
+    r = client.post("/subscriptions/", json=payload)
+    assert r.status_code == 201
+    sub_id = r.json()["id"]
+
+    # Entering the client runs the startup hooks, which start the batcher;
+    # leaving it runs shutdown, which flushes anything still buffered.
+    with client:
+        for i in range(3):
+            r = client.post(f"/ingest/{sub_id}", json={"n": i})
+            assert r.status_code == 202
+
+    assert delivery_queue.count == 3
+
+
+def test_ingest_forwards_canonical_signature(client, delivery_queue):
+    import hashlib
+    import hmac
+
+    payload = {"target_url": "https://example.com/hook", "secret": "s3cr3t"}
+    r = client.post("/subscriptions/", json=payload)
+    assert r.status_code == 201
+    sub_id = r.json()["id"]
+
+    # Sender omits the "sha256=" prefix
+    body = b'{"foo": "bar"}'
+    digest = hmac.new(b"s3cr3t", body, hashlib.sha256).hexdigest()
+    r = client.post(
+        f"/ingest/{sub_id}",
+        content=body,
+        headers={"Content-Type": "application/json", "X-Signature": digest},
+    )
+    assert r.status_code == 202
+
+    # The job carries the signature computed at ingest, in canonical form
+    job = delivery_queue.jobs[0]
+    assert job.args[4] == f"sha256={digest}"
+
+
+def test_sign_reuses_keyed_hmac_without_mutating_it():
+    import hashlib
+    import hmac
+    from src.api.routes.ingest import _sign
+
+    # Each body is signed from a copy of the cached keyed state, so
+    # earlier messages never leak into later signatures
+    for body in (b'{"a": 1}', b'{"b": 2}', b'{"a": 1}'):
+        digest = hmac.new(b"s3cr3t", body, hashlib.sha256).hexdigest()
+        assert _sign("s3cr3t", body) == f"sha256={digest}"
@@ -39,4 +39,43 @@ def test_purge_old_logs(db_session):
 
     # Assert that only the new log remains
     assert not old_exists, "Old log should have been deleted"
-    assert new_exists, "New log should still exist"
\ No newline at end of file
+    assert new_exists, "New log should still exist"
+
+def test_purge_old_logs_in_batches(db_session, monkeypatch):
+    from src.workers import log_retention
+
+    # Force several batches
+    monkeypatch.setattr(log_retention, "PURGE_BATCH_SIZE", 2)
+    webhook_id = uuid.uuid4()
+    db_session.add_all([
+        DeliveryLog(
+            webhook_id=webhook_id,
+            subscription_id=uuid.uuid4(),
+            target_url="http://old",
+            timestamp=datetime.utcnow() - timedelta(hours=73 + i),
+            attempt_number=1,
+            outcome="Failure",
+        )
+        for i in range(5)
+    ])
+    db_session.flush()
+
+    purge_old_logs(db=db_session)
+
+    assert db_session.query(DeliveryLog).filter_by(webhook_id=webhook_id).count() == 0
+
+
+def test_expired_partitions():
+    from src.workers.log_retention import _expired_partitions
+
+    cutoff = datetime(2025, 1, 10, 6, 0)
+    names = [
+        "delivery_logs_20250108",
+        "delivery_logs_20250109",
+        "delivery_logs_20250110",  # still holds rows newer than the cutoff
+        "delivery_logs_default",
+    ]
+    assert _expired_partitions(names, cutoff) == [
+        "delivery_logs_20250108",
+        "delivery_logs_20250109",
+    ]
@@ -0,0 +1,35 @@
+from collections import Counter
+
+from fastapi.routing import APIRoute
+from fastapi.middleware.cors import CORSMiddleware
+
+from src.api.main import app
+
+
+def test_no_duplicate_routes():
+    """Each (method, path) pair must be registered exactly once."""
+    registered = Counter(
+        (method, route.path)
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+    )
+    duplicates = [key for key, count in registered.items() if count > 1]
+    assert duplicates == []
+
+
+def test_expected_routes_registered():
+    """The routers are mounted with their prefixes."""
+    paths = {route.path for route in app.routes if isinstance(route, APIRoute)}
+    assert {
+        "/subscriptions/",
+        "/subscriptions/{subscription_id}",
+        "/ingest/{subscription_id}",
+        "/status/{webhook_id}",
+        "/subscriptions/{subscription_id}/attempts",
+        "/health",
+    } <= paths
+
+
+def test_cors_configured():
+    assert any(m.cls is CORSMiddleware for m in app.user_middleware)
@@ -154,4 +154,91 @@ def test_list_subscription_attempts_no_logs(client, db_session):
 
     r = client.get(f"/subscriptions/{sub.id}/attempts")
     assert r.status_code == 200
-    assert r.json() == [] # Expect an empty list
\ No newline at end of file
+    assert r.json() == [] # Expect an empty list
+
+def test_list_subscription_attempts_before_cursor(client, setup_logs):
+    """Test keyset pagination with the `before` parameter."""
+    sub_id = setup_logs["sub_id"]
+
+    r = client.get(f"/subscriptions/{sub_id}/attempts?limit=2")
+    assert r.status_code == 200
+    first_page = r.json()
+
+    cursor = first_page[-1]["timestamp"]
+    r = client.get(f"/subscriptions/{sub_id}/attempts", params={"limit": 2, "before": cursor})
+    assert r.status_code == 200
+    second_page = r.json()
+    assert len(second_page) == 2
+    # Continues where the first page stopped (attempt 1 of wh_id_fail, then wh_id_success)
+    assert second_page[0]["attempt_number"] == 1
+    assert second_page[0]["webhook_id"] == str(setup_logs["wh_id_fail"])
+    assert second_page[1]["webhook_id"] == str(setup_logs["wh_id_success"])
+
+def test_get_webhook_status_etag(client, setup_logs):
+    """Test conditional GET on the status endpoint."""
+    wh_id = setup_logs["wh_id_fail"]
+
+    r = client.get(f"/status/{wh_id}")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+
+    r = client.get(f"/status/{wh_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+def test_get_webhook_status_from_summary(client, setup_logs):
+    """Test that the status summary recorded by the worker is served from Redis."""
+    from src.cache.webhook_status import record_attempt
+
+    wh_id = uuid.uuid4()
+    sub_id = setup_logs["sub_id"]
+    for attempt, (outcome, code) in enumerate([("Failed Attempt", 500), ("Success", 200)], 1):
+        record_attempt({
+            "webhook_id": wh_id,
+            "subscription_id": sub_id,
+            "timestamp": datetime.utcnow(),
+            "attempt_number": attempt,
+            "outcome": outcome,
+            "status_code": code,
+            "error": None,
+        })
+
+    # No DeliveryLog rows exist for this webhook, so this can only come from Redis
+    r = client.get(f"/status/{wh_id}")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["subscription_id"] == str(sub_id)
+    assert data["total_attempts"] == 2
+    assert data["final_outcome"] == "Success"
+    assert data["last_status_code"] == 200
+    assert data["recent_attempts"] == []
+
+    # The attempt history still comes from Postgres
+    r = client.get(f"/status/{wh_id}", params={"include": "attempts"})
+    assert r.status_code == 404
+
+def test_status_summary_and_fallback_agree(client, setup_logs, redis_conn):
+    """The Redis summary carries the timestamp Postgres stored for the row."""
+    from src.cache.webhook_status import _make_key
+    from src.workers.log_writer import insert_logs
+
+    wh_id = uuid.uuid4()
+    insert_logs([{
+        "webhook_id": wh_id,
+        "subscription_id": setup_logs["sub_id"],
+        "target_url": "http://example.com/hook",
+        "attempt_number": 1,
+        "outcome": "Success",
+        "status_code": 200,
+        "error": None,
+    }])
+
+    from_summary = client.get(f"/status/{wh_id}")
+    assert from_summary.status_code == 200
+    assert from_summary.json()["recent_attempts"] == []
+
+    # Same answer (and ETag) once the summary has expired
+    redis_conn.delete(_make_key(str(wh_id)))
+    from_db = client.get(f"/status/{wh_id}")
+    assert from_db.status_code == 200
+    assert from_db.json()["last_attempt_at"] == from_summary.json()["last_attempt_at"]
+    assert from_db.headers["ETag"] == from_summary.headers["ETag"]
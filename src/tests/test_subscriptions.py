@@ -40,3 +40,37 @@ def test_subscription_crud_flow(client):
     # Confirm gone
     r = client.get(f"/subscriptions/{sub_id}")
     assert r.status_code == 404
+
+
+def test_list_subscriptions_matches_read_shape(client):
+    payload = {"target_url": "https://example.com/list-shape", "secret": "abc"}
+    r = client.post("/subscriptions/", json=payload)
+    assert r.status_code == 201
+    created = r.json()
+
+    r = client.get("/subscriptions/", params={"limit": 1000})
+    assert r.status_code == 200
+    listed = next(item for item in r.json() if item["id"] == created["id"])
+    assert listed == created
+
+
+def test_read_subscription_etag(client):
+    r = client.post("/subscriptions/", json={"target_url": "https://example.com/etag"})
+    assert r.status_code == 201
+    sub_id = r.json()["id"]
+
+    r = client.get(f"/subscriptions/{sub_id}")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+
+    # Unchanged -> 304 with no body
+    r = client.get(f"/subscriptions/{sub_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    # An update produces a new ETag
+    r = client.patch(f"/subscriptions/{sub_id}", json={"secret": "rotated"})
+    assert r.status_code == 200
+    r = client.get(f"/subscriptions/{sub_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
@@ -1,24 +1,130 @@
 import logging
 import os
-from datetime import datetime, timedelta
+from datetime import timedelta
 import requests
-from sqlalchemy.orm import Session
+from requests.adapters import HTTPAdapter
 
-from src.db.session import SessionLocal
-from src.models.delivery_log import DeliveryLog
-from src.queue.redis_conn import delivery_queue
+from src.queue.retry_queue import schedule_retry
 from src.cache.subscription_cache import get_subscription
+from src.queue.circuit_breaker import is_open as circuit_is_open, record_failure
+from src.workers.log_writer import write_log
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-HTTP_TIMEOUT = int(os.getenv("HTTP_TIMEOUT", "5"))
+HTTP_TIMEOUT = int(os.getenv("HTTP_TIMEOUT", "5"))  # read timeout, in seconds
+# Connecting is quick for any live host; a short connect timeout stops
+# unreachable targets (e.g. firewalls that drop SYNs) holding a worker
+# for the full HTTP_TIMEOUT on every attempt
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2"))  # in seconds
 MAX_ATTEMPTS = 5
 BACKOFF_SCHEDULE = [10, 30, 60, 300, 900]  # in seconds
+BACKOFF_DELTAS = tuple(timedelta(seconds=s) for s in BACKOFF_SCHEDULE)
+
+# One session per worker process so keep-alive connections to each target
+# host are reused across jobs instead of reconnecting (and re-handshaking
+# TLS) for every delivery. Retries are ours to schedule, not urllib3's.
+_adapter = HTTPAdapter(pool_connections=64, pool_maxsize=256, max_retries=0)
+_session = requests.Session()
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+def _build_headers(content_type, event_type, signature) -> dict:
+    headers = {"Content-Type": content_type}
+    if event_type:
+        headers["X-Event-Type"] = event_type
+    if signature:
+        headers["X-Signature"] = signature
+    return headers
+
+# 4xx responses mean the request itself was rejected; resending the same
+# body won't change that. These two are the exceptions.
+RETRYABLE_4XX = frozenset({408, 429})  # Request Timeout, Too Many Requests
+
+# Logged instead of an HTTP error when the target's circuit breaker is open
+CIRCUIT_OPEN_ERROR = "Circuit open"
+
+def _is_transient(status_code, error_details) -> bool:
+    """
+    True for failures worth retrying: 5xx, 408/429, or no response at all
+    (timeout, connection error; status_code is None).
+    """
+    if error_details is None:
+        return False
+    return (
+        status_code is None
+        or status_code >= 500
+        or status_code in RETRYABLE_4XX
+    )
+
+def _classify(status_code, error_details, attempt) -> tuple[str, bool]:
+    """Return (outcome, should_retry) for an attempt; error_details is None on 2xx."""
+    if error_details is None:
+        return "Success", False
+    if _is_transient(status_code, error_details) and attempt < MAX_ATTEMPTS:
+        return "Failed Attempt", True
+    return "Failure", False
+
+def _attempt_row(
+    webhook_id,
+    subscription_id,
+    target,
+    attempt,
+    outcome,
+    status_code,
+    error_details,
+) -> dict:
+    return {
+        "webhook_id": webhook_id,
+        "subscription_id": subscription_id,
+        "target_url": target,
+        "attempt_number": attempt,
+        "outcome": outcome,
+        "status_code": status_code,
+        "error": error_details,
+    }
+
+def _log_attempt(
+    webhook_id,
+    subscription_id,
+    target,
+    attempt,
+    outcome,
+    status_code,
+    error_details,
+):
+    """Persist one delivery attempt (which also updates the webhook's status summary)."""
+    row = _attempt_row(
+        webhook_id, subscription_id, target, attempt,
+        outcome, status_code, error_details,
+    )
+    write_log(row)
+
+def _schedule_retry(
+    subscription_id,
+    body,
+    content_type,
+    event_type,
+    signature,
+    webhook_id,
+    attempt,
+):
+    """Schedule the next attempt after this attempt's backoff delay."""
+    schedule_retry(
+        BACKOFF_DELTAS[attempt - 1],
+        subscription_id,
+        body,
+        content_type,
+        event_type,
+        signature,
+        webhook_id,
+        attempt + 1,
+    )
 
 def process_delivery(
     subscription_id,
-    payload,
+    body,
+    content_type,
     event_type,
     signature,
     webhook_id,
@@ -26,9 +132,14 @@ def process_delivery(
 ):
     """
     1) Fetch subscription from Redis cache (fallback to DB).
-    2) Attempt HTTP POST to target_url.
-    3) Log each attempt to Postgres.
-    4) If attempt < MAX, reschedule with exponential backoff.
+    2) Attempt HTTP POST of the raw ingested body to target_url.
+    3) Log the attempt to Postgres (batched by the log writer): one row
+       per call, "Failure" once attempts are exhausted.
+    4) If it failed with a retryable error (5xx, 408/429, timeout or
+       connection error) and attempt < MAX, reschedule with exponential
+       backoff. Other 4xx responses fail immediately. While the target's
+       circuit breaker is open the POST is skipped and the attempt is
+       retried on the normal schedule.
     """
     # Cache-first subscription lookup
     sub_data = get_subscription(subscription_id)
@@ -37,115 +148,50 @@ def process_delivery(
         return
 
     target = sub_data["target_url"]
-    headers = {"Content-Type": "application/json"}
-    if event_type:
-        headers["X-Event-Type"] = event_type
-    if signature:
-        headers["X-Signature"] = signature
+    headers = _build_headers(content_type, event_type, signature)
 
-    db: Session = SessionLocal()
-    try:
-        status_code = None
-        error_details = None
-        outcome = None
+    status_code = None
+    error_details = None
 
+    if circuit_is_open(target):
+        # The target has been failing; don't hold this worker for up to
+        # HTTP_TIMEOUT on a request that is almost certainly doomed
+        error_details = CIRCUIT_OPEN_ERROR
+    else:
         # Perform the POST
         try:
-            resp = requests.post(
+            resp = _session.post(
                 target,
-                json=payload,
+                data=body,
                 headers=headers,
-                timeout=HTTP_TIMEOUT,
+                timeout=(HTTP_CONNECT_TIMEOUT, HTTP_TIMEOUT),
             )
             status_code = resp.status_code
-            if 200 <= status_code < 300:
-                outcome = "Success"
-            else:
-                outcome = "Failed Attempt"
+            if not 200 <= status_code < 300:
                 error_details = f"HTTP {status_code}"
-                logger.error(f"Delivery failed: {error_details}")
-
-                if attempt < MAX_ATTEMPTS:
-                    db.add(
-                        DeliveryLog(
-                            webhook_id=webhook_id,
-                            subscription_id=subscription_id,
-                            target_url=target,
-                            timestamp=datetime.utcnow(),
-                            attempt_number=attempt,
-                            outcome=outcome,
-                            status_code=status_code,
-                            error=error_details,
-                        )
-                    )
-                    db.commit()
-
-                    # Schedule next attempt
-                    delay = BACKOFF_SCHEDULE[attempt - 1]
-                    delivery_queue.enqueue_in(
-                        timedelta(seconds=delay),
-                        process_delivery,
-                        subscription_id,
-                        payload,
-                        event_type,
-                        signature,
-                        webhook_id,
-                        attempt + 1,
-                    )
-                    return
-
         except Exception as exc:
-            # Recoverable failure: log & re-enqueue if attempts remain
-            if attempt < MAX_ATTEMPTS:
-                outcome = "Failed Attempt"
-                error_details = str(exc)
-
-                # Persist this attempt
-                db.add(
-                    DeliveryLog(
-                        webhook_id=webhook_id,
-                        subscription_id=subscription_id,
-                        target_url=target,
-                        timestamp=datetime.utcnow(),
-                        attempt_number=attempt,
-                        outcome=outcome,
-                        status_code=status_code,
-                        error=error_details,
-                    )
-                )
-                db.commit()
-
-                # Schedule next attempt with backoff
-                delay = BACKOFF_SCHEDULE[attempt - 1]
-                delivery_queue.enqueue_in(
-                    timedelta(seconds=delay),
-                    process_delivery,
-                    subscription_id,
-                    payload,
-                    event_type,
-                    signature,
-                    webhook_id,
-                    attempt + 1,
-                )
-                return
-            # else fall through to final failure
-
-        # Final log (either success or last failure)
-        if outcome is None:
-            outcome = "Success"
-        db.add(
-            DeliveryLog(
-                webhook_id=webhook_id,
-                subscription_id=subscription_id,
-                target_url=target,
-                timestamp=datetime.utcnow(),
-                attempt_number=attempt,
-                outcome=outcome,
-                status_code=status_code,
-                error=error_details,
-            )
-        )
-        db.commit()
+            # Connection errors, timeouts, etc. are retried like 5xx
+            error_details = str(exc) or type(exc).__name__
+        if _is_transient(status_code, error_details):
+            record_failure(target)
+
+    outcome, should_retry = _classify(status_code, error_details, attempt)
+    if error_details is not None:
+        logger.error(f"Delivery failed: {error_details}")
 
-    finally:
-        db.close()
+    # Exactly one log row per attempt
+    _log_attempt(
+        webhook_id, subscription_id, target, attempt,
+        outcome, status_code, error_details,
+    )
+
+    if should_retry:
+        _schedule_retry(
+            subscription_id,
+            body,
+            content_type,
+            event_type,
+            signature,
+            webhook_id,
+            attempt,
+        )
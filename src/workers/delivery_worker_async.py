@@ -0,0 +1,237 @@
+"""
+Asyncio fan-out consumer for the deliveries queue.
+
+An alternative to running `rq worker` on the deliveries queue: instead of
+one blocking POST per job, it pops up to ASYNC_BATCH_SIZE jobs at a time,
+sends all of their POSTs concurrently on one event loop, writes the
+resulting log rows in one transaction and schedules retries exactly like
+process_delivery does.
+
+Jobs are taken straight off the queue's Redis list, so RQ's started/
+finished registries are not used; a consumer killed mid-batch loses that
+batch's in-flight attempts. If a batch fails part-way (e.g. a database
+error looking up subscriptions), its unfinished jobs are pushed back to
+the front of the queue, so a delivery may be attempted twice but is not
+lost. A job whose arguments can't be unpacked goes to the queue's failed
+job registry. Retries go through the same delayed retry set as the RQ
+worker, and this process runs its own dispatcher for it.
+
+Usage: python -m src.workers.delivery_worker_async
+"""
+import asyncio
+import logging
+import os
+import traceback
+
+import httpx
+from rq.job import Job, JobStatus
+
+from src.cache.subscription_cache import get_subscription, start_invalidation_listener
+from src.queue import redis_conn as queue_module
+from src.queue.circuit_breaker import open_circuits, record_failure
+from src.queue.retry_queue import start_retry_dispatcher
+from src.workers.delivery_worker import (
+    CIRCUIT_OPEN_ERROR,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_TIMEOUT,
+    _attempt_row,
+    _build_headers,
+    _classify,
+    _is_transient,
+    _schedule_retry,
+)
+from src.workers.log_writer import insert_logs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ASYNC_BATCH_SIZE = int(os.getenv("ASYNC_DELIVERY_BATCH_SIZE", "200"))
+ASYNC_MAX_CONNECTIONS = int(os.getenv("ASYNC_DELIVERY_MAX_CONNECTIONS", "500"))
+ASYNC_MAX_KEEPALIVE = int(os.getenv("ASYNC_DELIVERY_MAX_KEEPALIVE", "100"))
+POLL_TIMEOUT = 5  # in seconds
+
+# Jobs this consumer knows how to run; anything else is left to RQ
+DELIVERY_FUNC = "src.workers.delivery_worker.process_delivery"
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _pop_job_ids(queue, timeout: int) -> list[str]:
+    """
+    Pop up to ASYNC_BATCH_SIZE job ids off the queue, waiting up to
+    `timeout` seconds for the first one if the queue is empty.
+    """
+    conn = queue.connection
+    ids = conn.lpop(queue.key, ASYNC_BATCH_SIZE) or []
+    if not ids and timeout:
+        popped = conn.blpop([queue.key], timeout)
+        if popped:
+            ids = [popped[1]] + (conn.lpop(queue.key, ASYNC_BATCH_SIZE - 1) or [])
+    return [_decode(job_id) for job_id in ids]
+
+
+def _requeue(queue, job_ids: list[str]) -> None:
+    """Push job ids back to the front of the queue, in their original order."""
+    if job_ids:
+        queue.connection.lpush(queue.key, *reversed(job_ids))
+
+
+def _load_batch(queue, job_ids: list[str]) -> tuple[list[Job], dict, set]:
+    """
+    Fetch the jobs, the subscriptions they target and which of those
+    targets have an open circuit (off the event loop).
+    """
+    jobs, foreign = [], []
+    for job in Job.fetch_many(job_ids, connection=queue.connection):
+        if job is None:
+            continue
+        if job.func_name != DELIVERY_FUNC:
+            foreign.append(job)
+            continue
+        jobs.append(job)
+    subs = {}
+    for job in jobs:
+        sid = job.args[0] if job.args else None
+        if sid not in subs:
+            subs[sid] = get_subscription(sid) if sid is not None else None
+    tripped = open_circuits(list({sub["target_url"] for sub in subs.values() if sub}))
+    # Last, so a failure above leaves every id to be requeued exactly once
+    for job in foreign:
+        # Not ours: hand it back to the queue for an RQ worker
+        logger.warning(f"[AsyncDelivery] Re-queueing foreign job {job.id} ({job.func_name})")
+        queue.enqueue_job(job)
+    return jobs, subs, tripped
+
+
+async def _skip():
+    """Stand-in for a POST to a target whose circuit is open."""
+    return None, CIRCUIT_OPEN_ERROR
+
+
+async def _post(client: httpx.AsyncClient, target: str, body: bytes, headers: dict):
+    """POST one delivery; returns (status_code, error_details)."""
+    try:
+        resp = await client.post(target, content=body, headers=headers)
+    except Exception as exc:
+        return None, str(exc) or type(exc).__name__
+    if not 200 <= resp.status_code < 300:
+        return resp.status_code, f"HTTP {resp.status_code}"
+    return resp.status_code, None
+
+
+def _finish_batch(
+    queue,
+    jobs: list[Job],
+    rows: list[dict],
+    retries: list[tuple],
+    failed_targets: list[str],
+    broken: list[tuple[Job, str]] = (),
+) -> None:
+    """
+    Persist the batch's outcomes, feed transient failures to the circuit
+    breaker, schedule retries, move broken jobs to the failed registry and
+    drop the finished jobs.
+    """
+    for target in failed_targets:
+        record_failure(target)
+    if rows:
+        try:
+            insert_logs(rows)
+        except Exception:
+            logger.exception(f"[AsyncDelivery] Failed to write {len(rows)} delivery log(s)")
+    for args in retries:
+        _schedule_retry(*args)
+    pipe = queue.connection.pipeline()
+    failed_ids = set()
+    for job, exc_string in broken:
+        job.set_status(JobStatus.FAILED, pipeline=pipe)
+        queue.failed_job_registry.add(job, exc_string=exc_string, pipeline=pipe)
+        failed_ids.add(job.id)
+    for job in jobs:
+        if job.id not in failed_ids:
+            job.delete(pipeline=pipe, remove_from_queue=False)
+    pipe.execute()
+
+
+async def process_batch(client: httpx.AsyncClient, queue=None, timeout: int = POLL_TIMEOUT) -> int:
+    """
+    Deliver one batch of jobs concurrently. Returns the number of jobs
+    taken off the queue (0 if it stayed empty for `timeout` seconds).
+    """
+    queue = queue or queue_module.delivery_queue
+    job_ids = await asyncio.to_thread(_pop_job_ids, queue, timeout)
+    if not job_ids:
+        return 0
+    # The ids are off the queue now; until the batch is finished, any
+    # failure must put them back rather than drop the deliveries
+    unfinished = job_ids
+    try:
+        jobs, subs, tripped = await asyncio.to_thread(_load_batch, queue, job_ids)
+        unfinished = [job.id for job in jobs]
+
+        sends, broken = [], []
+        for job in jobs:
+            try:
+                subscription_id, body, content_type, event_type, signature, webhook_id, attempt = job.args
+            except (TypeError, ValueError):
+                logger.error(f"[AsyncDelivery] Job {job.id} has malformed args, marking failed")
+                broken.append((job, traceback.format_exc()))
+                continue
+            sub_data = subs.get(subscription_id)
+            if not sub_data:
+                logger.error(f"[AsyncDelivery] Sub {subscription_id} not found, dropping job")
+                continue
+            target = sub_data["target_url"]
+            if target in tripped:
+                send = _skip()
+            else:
+                headers = _build_headers(content_type, event_type, signature)
+                send = _post(client, target, body, headers)
+            sends.append((job, target, send))
+        results = await asyncio.gather(*(send for _, _, send in sends))
+
+        rows, retries, failed_targets = [], [], []
+        for (job, target, _), (status_code, error_details) in zip(sends, results):
+            subscription_id, body, content_type, event_type, signature, webhook_id, attempt = job.args
+            outcome, should_retry = _classify(status_code, error_details, attempt)
+            if error_details is not None:
+                logger.error(f"Delivery failed: {error_details}")
+            rows.append(_attempt_row(
+                webhook_id, subscription_id, target, attempt,
+                outcome, status_code, error_details,
+            ))
+            if should_retry:
+                retries.append(job.args)
+            if target not in tripped and _is_transient(status_code, error_details):
+                failed_targets.append(target)
+
+        await asyncio.to_thread(_finish_batch, queue, jobs, rows, retries, failed_targets, broken)
+    except BaseException:
+        logger.error(f"[AsyncDelivery] Batch failed, re-queueing {len(unfinished)} job(s)")
+        await asyncio.to_thread(_requeue, queue, unfinished)
+        raise
+    return len(job_ids)
+
+
+async def run() -> None:
+    """Consume the deliveries queue until cancelled."""
+    start_invalidation_listener()
+    start_retry_dispatcher()
+    limits = httpx.Limits(
+        max_connections=ASYNC_MAX_CONNECTIONS,
+        max_keepalive_connections=ASYNC_MAX_KEEPALIVE,
+    )
+    timeout = httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        while True:
+            try:
+                await process_batch(client)
+            except Exception:
+                logger.exception("[AsyncDelivery] Batch failed")
+                await asyncio.sleep(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -1,12 +1,55 @@
 import logging
+import os
+import re
 from datetime import datetime, timedelta
+from sqlalchemy import text
 from sqlalchemy.orm import Session # Import Session
 from src.db.session import SessionLocal
-from src.models.delivery_log import DeliveryLog
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PURGE_BATCH_SIZE = int(os.getenv("LOG_PURGE_BATCH_SIZE", "10000"))
+
+# Delete in bounded batches so a large backlog doesn't hold one long
+# transaction (and its row locks) open. ctid is only unique within one
+# physical table, so match on tableoid too in case delivery_logs is
+# partitioned.
+_PURGE_BATCH = text("""
+    DELETE FROM delivery_logs
+    WHERE (tableoid, ctid) IN (
+        SELECT tableoid, ctid FROM delivery_logs
+        WHERE timestamp < :cutoff
+        LIMIT :batch_size
+    )
+""")
+
+_CUTOFF = text("SELECT (now() AT TIME ZONE 'utc') - interval '72 hours'")
+
+# If delivery_logs has been converted to a table partitioned by
+# RANGE (timestamp) with daily children named delivery_logs_YYYYMMDD,
+# whole expired days are dropped instead of deleted row by row.
+_PARTITION_NAME = re.compile(r"^delivery_logs_(\d{8})$")
+
+_LIST_PARTITIONS = text("""
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'delivery_logs'::regclass
+""")
+
+def _expired_partitions(names: list[str], cutoff: datetime) -> list[str]:
+    """Daily partitions whose whole range is older than the cutoff."""
+    expired = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match is None:
+            continue  # e.g. a DEFAULT partition; handled by the DELETE
+        day_end = datetime.strptime(match.group(1), "%Y%m%d") + timedelta(days=1)
+        if day_end <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
 def purge_old_logs(db: Session | None = None):
     """
     Delete delivery logs older than 72 hours.
@@ -21,15 +64,31 @@ def purge_old_logs(db: Session | None = None):
         session_created = True
 
     try:
-        cutoff = datetime.utcnow() - timedelta(hours=72)
-        # Use the provided or newly created session 'db'
-        deleted = db.query(DeliveryLog) \
-                    .filter(DeliveryLog.timestamp < cutoff) \
-                    .delete(synchronize_session=False)
+        # Use the database clock, which also stamps the rows
+        cutoff = db.execute(_CUTOFF).scalar_one()
+        # Dropping a partition is a metadata change: no dead tuples, no
+        # vacuum. Names are validated by _PARTITION_NAME, so quoting is safe.
+        partitions = db.execute(_LIST_PARTITIONS).scalars().all()
+        for name in _expired_partitions(partitions, cutoff):
+            db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+            if session_created:
+                db.commit()
+            logger.info(f"Dropped delivery log partition {name}")
 
-        # Only commit if we created the session within this function
-        if session_created:
-            db.commit()
+        # Whatever is left: an unpartitioned table, the partially expired
+        # day, or rows that landed in a DEFAULT partition
+        deleted = 0
+        while True:
+            result = db.execute(
+                _PURGE_BATCH, {"cutoff": cutoff, "batch_size": PURGE_BATCH_SIZE}
+            )
+            deleted += result.rowcount
+            # Only commit if we created the session within this function;
+            # a caller-provided session keeps everything in its transaction
+            if session_created:
+                db.commit()
+            if result.rowcount < PURGE_BATCH_SIZE:
+                break
 
         logger.info(f"Purged {deleted} delivery log(s) before {cutoff.isoformat()}")
     except Exception:
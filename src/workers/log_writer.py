@@ -0,0 +1,99 @@
+import atexit
+import logging
+import os
+import threading
+
+from sqlalchemy import insert
+
+from src.cache.webhook_status import record_attempts
+from src.db.session import engine
+from src.models.delivery_log import DeliveryLog
+
+logger = logging.getLogger(__name__)
+
+LOG_BATCH_SIZE = int(os.getenv("DELIVERY_LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL = float(os.getenv("DELIVERY_LOG_FLUSH_MS", "200")) / 1000  # in seconds
+# Rows kept for retry while Postgres is unreachable; beyond this the
+# oldest are dropped so an outage can't grow memory without bound
+LOG_BUFFER_MAX = int(os.getenv("DELIVERY_LOG_BUFFER_MAX", "20000"))
+
+_buf: list[dict] = []
+_buf_lock = threading.Lock()
+_wakeup = threading.Event()
+_flusher: threading.Thread | None = None
+
+
+def insert_logs(rows: list[dict]) -> None:
+    """
+    Write rows to delivery_logs in a single transaction, then fold them
+    into the webhooks' status summaries. Log rows are write-once, so this
+    is a Core INSERT with no Session or identity map; the id default
+    (uuid4) is filled in client-side. Postgres assigns the timestamps and
+    returns them, so the summary in Redis carries the same last_attempt_at
+    (and ETag) as a status read that falls back to Postgres.
+    """
+    stmt = insert(DeliveryLog).returning(DeliveryLog.timestamp, sort_by_parameter_order=True)
+    with engine.begin() as conn:
+        timestamps = conn.execute(stmt, rows).scalars().all()
+    for row, timestamp in zip(rows, timestamps):
+        row["timestamp"] = timestamp
+    record_attempts(rows)
+
+
+def flush_logs() -> None:
+    """
+    Write everything currently buffered. If the insert fails (e.g. a
+    PgBouncer restart or failover), the rows go back to the front of the
+    buffer and are retried on the next flush.
+    """
+    with _buf_lock:
+        if not _buf:
+            return
+        rows = _buf[:]
+        _buf.clear()
+    try:
+        insert_logs(rows)
+    except Exception:
+        logger.exception(f"[LogWriter] Failed to write {len(rows)} delivery log(s), will retry")
+        with _buf_lock:
+            _buf[:0] = rows
+            overflow = len(_buf) - LOG_BUFFER_MAX
+            if overflow > 0:
+                del _buf[:overflow]
+        if overflow > 0:
+            logger.error(f"[LogWriter] Buffer full, dropped {overflow} oldest delivery log(s)")
+
+
+def write_log(row: dict) -> None:
+    """
+    Queue one delivery log row. Rows are inserted in batches every
+    LOG_FLUSH_INTERVAL or LOG_BATCH_SIZE rows, whichever comes first.
+    If the writer thread is not running (e.g. tests, one-off scripts),
+    the row is inserted immediately.
+    """
+    if _flusher is None:
+        insert_logs([row])
+        return
+    with _buf_lock:
+        _buf.append(row)
+        full = len(_buf) >= LOG_BATCH_SIZE
+    if full:
+        _wakeup.set()
+
+
+def _flush_loop() -> None:
+    while True:
+        _wakeup.wait(LOG_FLUSH_INTERVAL)
+        _wakeup.clear()
+        flush_logs()
+
+
+def start_log_writer() -> None:
+    """Start the background writer. Call once per worker process."""
+    global _flusher
+    if _flusher is not None:
+        return
+    _flusher = threading.Thread(target=_flush_loop, name="delivery-log-writer", daemon=True)
+    _flusher.start()
+    # The thread is a daemon; write out what's left when the process exits
+    atexit.register(flush_logs)
@@ -0,0 +1,26 @@
+from rq.worker import SimpleWorker
+
+from src.cache.subscription_cache import start_invalidation_listener
+from src.queue.retry_queue import start_retry_dispatcher
+from src.workers.log_writer import start_log_writer
+
+
+class DeliveryWorker(SimpleWorker):
+    """
+    RQ worker for the deliveries queue.
+
+    Runs jobs in-process (no fork per job) so module-level state survives
+    between deliveries: the HTTP connection pool, the process-local
+    subscription cache and the batched delivery log writer. The cache is
+    kept coherent with API writes by the same pub/sub invalidation
+    listener the API processes run. Each worker also runs a retry
+    dispatcher that moves due retries onto the queue.
+
+    Usage: rq worker --worker-class src.workers.rq_worker.DeliveryWorker deliveries
+    """
+
+    def work(self, *args, **kwargs):
+        start_invalidation_listener()
+        start_log_writer()
+        start_retry_dispatcher()
+        return super().work(*args, **kwargs)
@@ -88,7 +88,7 @@ def get_webhook_status(webhook_id):
     """Fetches status and attempts for a specific webhook ID."""
     try:
         uuid.UUID(webhook_id) # Validate UUID
-        response = requests.get(f"{API_BASE_URL}/status/{webhook_id}")
+        response = requests.get(f"{API_BASE_URL}/status/{webhook_id}", params={"include": "attempts"})
         return handle_response(response)
     except ValueError:
         st.error("Invalid Webhook ID format. Please enter a valid UUID.")